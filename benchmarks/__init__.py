@@ -0,0 +1 @@
+# 这个包提供可复现的性能基准：合成箱子清单生成器（generator）和计时运行器（runner）。
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+# 这个文件实现了带种子的合成箱子清单生成器：箱子数量、尺寸分布、易碎比例和容器尺寸都可以配置。
+# 生成的清单与 optimizer/manifest.py 读取的列格式相同，可以直接写成 CSV 或转换成 Box / BoxSet。
+
+DEFAULT_CONTAINER = {'width': 18, 'height': 8, 'depth': 8}
+
+# 生成一个清单，返回列字典（box_id、width、height、depth、is_fragile）
+# distribution='uniform'：边长为 [min_size, max_size] 内的整数；
+# distribution='lognormal'：对数正态分布，截断到 [min_size, max_size] 后取 0.5 的倍数（与高度图网格对齐）
+def generate_manifest(n_boxes, seed=None, distribution='uniform', min_size=1, max_size=5, fragile_ratio=0.2):
+    rng = np.random.default_rng(seed)
+    if distribution == 'uniform':
+        dims = rng.integers(min_size, max_size + 1, size=(n_boxes, 3)).astype(np.float64)
+    elif distribution == 'lognormal':
+        mean = np.log(np.sqrt(min_size * max_size))
+        dims = rng.lognormal(mean, 0.5, size=(n_boxes, 3))
+        dims = np.clip(np.round(dims * 2) / 2, min_size, max_size)
+    else:
+        raise ValueError(f"unknown size distribution: {distribution}")
+    return {
+        'box_id': np.arange(1, n_boxes + 1, dtype=np.int64),
+        'width': dims[:, 0],
+        'height': dims[:, 1],
+        'depth': dims[:, 2],
+        'is_fragile': rng.random(n_boxes) < fragile_ratio,
+    }
+
+# 按默认容器的长宽高比例放大或缩小容器，使箱子总体积约占容器体积的 fill；边长取整数且不小于最大的箱子边长
+def container_for(cols, fill=0.5, shape=DEFAULT_CONTAINER):
+    total = float((cols['width'] * cols['height'] * cols['depth']).sum())
+    base = shape['width'] * shape['height'] * shape['depth']
+    scale = (total / fill / base) ** (1 / 3)
+    largest = max(cols['width'].max(), cols['height'].max(), cols['depth'].max()) if len(cols['box_id']) else 1
+    return {axis: float(max(np.ceil(shape[axis] * scale), largest)) for axis in ('width', 'height', 'depth')}
+
+def write_manifest(cols, path):
+    df = pd.DataFrame({name: cols[name] for name in ('box_id', 'width', 'height', 'depth')})
+    df['is_fragile'] = cols['is_fragile'].astype(np.int64)
+    df.to_csv(path, index=False)
@@ -0,0 +1,183 @@
+import argparse
+import csv
+import json
+import platform
+import random
+import time
+from optimizer.box import Box
+from optimizer.cost_functions import PlacementEngine, advanced_cost_function, place_box
+from optimizer.evaluation import evaluate
+from optimizer.manifest import boxes_from_columns
+from optimizer.sa_optimizer import iter_annealing, simulated_annealing
+from optimizer.solution_io import solution_columns, solution_to_array
+from optimizer.validation import validate
+from .generator import container_for, generate_manifest
+
+# 这个文件是基准运行器：对不同规模的合成清单计时放置、成本函数、固定迭代次数的模拟退火和评估器，
+# 结果以 JSON 或 CSV 输出（每个基准一行），用于跟踪各版本的吞吐量和规模曲线。
+# 用法：python -m benchmarks.runner --sizes 10 100 1000 --output results.json
+
+FIELDS = ('benchmark', 'n_boxes', 'distribution', 'fragile_ratio', 'container', 'seed', 'repeat', 'seconds',
+          'per_second', 'unit', 'feasible', 'best_cost', 'iterations', 'stop_reason', 'gap')
+
+# 运行 repeat 次，返回最短耗时（秒）；setup 在每次计时前调用，返回值作为 fn 的参数
+def _best_time(fn, setup, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _fresh(boxes):
+    return lambda: [b.copy() for b in boxes]
+
+# 生成清单和容器：container 为 None 时按 fill 由箱子总体积推出容器，否则使用给定的容器
+def _manifest(n_boxes, seed, distribution, fill, fragile_ratio, container):
+    cols = generate_manifest(n_boxes, seed=seed, distribution=distribution, fragile_ratio=fragile_ratio)
+    return cols, container if container is not None else container_for(cols, fill)
+
+def _container_label(container):
+    return f"{container['width']:g}x{container['height']:g}x{container['depth']:g}"
+
+# 对一个清单运行全部基准，返回结果记录列表；清单放不进容器（成本为 1e12）时记录都标记为 feasible=False，
+# 这时摆放结果不完整，跳过评估器和校验的计时
+# fragile_ratio 为易碎箱子的比例；container 不为 None 时使用这个容器，不再按 fill 推出容器
+def run_size(n_boxes, seed=0, distribution='uniform', fill=0.5, repeat=3, sa_iterations=50, probes=20,
+             sa_max_boxes=500, fragile_ratio=0.2, container=None):
+    cols, container = _manifest(n_boxes, seed, distribution, fill, fragile_ratio, container)
+    boxes = boxes_from_columns(cols)
+    records = []
+    # 按解码器的规则放置一遍，得到摆放结果和放置引擎（遇到第一个放不下的箱子就停止）
+    engine = PlacementEngine(container)
+    for box in sorted((b.copy() for b in boxes), reverse=True,
+                      key=lambda b: b.original_width * b.original_height * b.original_depth):
+        if not place_box(engine, box):
+            break
+    placed = engine.placed_boxes
+    feasible = len(placed) == n_boxes
+
+    def record(name, seconds, count, unit):
+        records.append({
+            'benchmark': name, 'n_boxes': n_boxes, 'distribution': distribution, 'fragile_ratio': fragile_ratio,
+            'container': _container_label(container), 'seed': seed, 'repeat': repeat, 'seconds': seconds,
+            'per_second': count / seconds if seconds > 0 else float('inf'), 'unit': unit, 'feasible': feasible,
+        })
+
+    seconds = _best_time(lambda order: advanced_cost_function(order, container), _fresh(boxes), repeat)
+    record('advanced_cost_function', seconds, n_boxes, 'boxes')
+
+    # 在摆放结果上测量放入一个新箱子的单次调用耗时：引擎只建立一次（每次计时前复制，
+    # 让每轮都从同样的状态开始），只计时 PlacementEngine.try_place 本身
+    probe_dims = list(zip(cols['width'][:probes].tolist(), cols['height'][:probes].tolist(),
+                          cols['depth'][:probes].tolist()))
+
+    def place_probes(probe_engine):
+        for w, h, d in probe_dims:
+            probe_engine.try_place(Box(0, w, h, d))
+
+    seconds = _best_time(place_probes, engine.copy, repeat)
+    record('placement_engine.try_place', seconds, len(probe_dims), 'calls')
+
+    if n_boxes <= sa_max_boxes:
+        def anneal(order):
+            simulated_annealing(order, container, stop_T=0, max_iter=sa_iterations, rng=random.Random(seed),
+                                verbose=False)
+        seconds = _best_time(anneal, _fresh(boxes), repeat)
+        record('simulated_annealing', seconds, sa_iterations, 'iterations')
+
+    if not feasible:
+        return records
+    layout = solution_columns(solution_to_array(placed))
+    seconds = _best_time(lambda _: evaluate(layout, container), lambda: None, repeat)
+    record('evaluate', seconds, n_boxes, 'boxes')
+    seconds = _best_time(lambda _: validate(layout, container), lambda: None, repeat)
+    record('validate', seconds, n_boxes, 'boxes')
+    return records
+
+# 用同一个清单比较不同的降温策略：记录最终成本、迭代次数、停止原因、与下界的间隙和耗时
+def compare_schedules(n_boxes, schedules=('geometric', 'acceptance', 'variance'), seed=0, distribution='uniform',
+                      fill=0.5, stagnation_window=None, max_iter=10000, gap_tolerance=None, fragile_ratio=0.2,
+                      container=None):
+    cols, container = _manifest(n_boxes, seed, distribution, fill, fragile_ratio, container)
+    boxes = boxes_from_columns(cols)
+    records = []
+    for schedule in schedules:
+        start = time.perf_counter()
+        for progress in iter_annealing([b.copy() for b in boxes], container, max_iter=max_iter, rng=random.Random(seed),
+                                       verbose=False, schedule=schedule, stagnation_window=stagnation_window,
+                                       gap_tolerance=gap_tolerance):
+            pass
+        seconds = time.perf_counter() - start
+        records.append({
+            'benchmark': f'sa_schedule[{schedule}]', 'n_boxes': n_boxes, 'distribution': distribution,
+            'fragile_ratio': fragile_ratio, 'container': _container_label(container), 'seed': seed, 'repeat': 1,
+            'seconds': seconds, 'per_second': progress.iteration / seconds, 'unit': 'iterations',
+            'best_cost': progress.best_cost, 'iterations': progress.iteration, 'stop_reason': progress.stop_reason,
+            'gap': progress.gap,
+        })
+    return records
+
+def run(sizes, schedules=None, stagnation_window=None, gap_tolerance=None, **kwargs):
+    records = []
+    for n_boxes in sizes:
+        records.extend(run_size(n_boxes, **kwargs))
+        if schedules and n_boxes <= kwargs.get('sa_max_boxes', 500):
+            records.extend(compare_schedules(n_boxes, schedules, seed=kwargs.get('seed', 0),
+                                             distribution=kwargs.get('distribution', 'uniform'),
+                                             fill=kwargs.get('fill', 0.5), stagnation_window=stagnation_window,
+                                             gap_tolerance=gap_tolerance,
+                                             fragile_ratio=kwargs.get('fragile_ratio', 0.2),
+                                             container=kwargs.get('container')))
+    return records
+
+def write_results(records, path):
+    if str(path).endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS, restval='')
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': records},
+                      f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the packing benchmarks on synthetic manifests')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--distribution', choices=('uniform', 'lognormal'), default='uniform')
+    parser.add_argument('--fill', type=float, default=0.5, help='total box volume / container volume')
+    parser.add_argument('--fragile-ratio', type=float, default=0.2, help='fraction of fragile boxes')
+    parser.add_argument('--container', type=float, nargs=3, metavar=('WIDTH', 'HEIGHT', 'DEPTH'), default=None,
+                        help='use this container for every size instead of deriving one from --fill')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sa-iterations', type=int, default=50)
+    parser.add_argument('--sa-max-boxes', type=int, default=500, help='skip SA above this many boxes')
+    parser.add_argument('--schedules', nargs='*', choices=('geometric', 'acceptance', 'variance'),
+                        help='also run full SA with each cooling schedule and report final quality')
+    parser.add_argument('--stagnation-window', type=int, default=None)
+    parser.add_argument('--gap-tolerance', type=float, default=None,
+                        help='stop a schedule run once its gap to the lower bound is this small')
+    parser.add_argument('--output', help='write results to this .json or .csv file')
+    args = parser.parse_args(argv)
+    records = run(args.sizes, schedules=args.schedules, stagnation_window=args.stagnation_window,
+                  gap_tolerance=args.gap_tolerance, seed=args.seed,
+                  distribution=args.distribution, fill=args.fill, fragile_ratio=args.fragile_ratio,
+                  container=None if args.container is None else dict(zip(('width', 'height', 'depth'), args.container)),
+                  repeat=args.repeat,
+                  sa_iterations=args.sa_iterations, sa_max_boxes=args.sa_max_boxes)
+    for r in records:
+        line = f"{r['benchmark']:<32} n={r['n_boxes']:<6} {r['seconds']:.4f}s  {r['per_second']:.1f} {r['unit']}/s"
+        if not r.get('feasible', True):
+            line += "  (infeasible)"
+        if 'best_cost' in r:
+            line += f"  cost={r['best_cost']:.2f} gap={r['gap']:.2%} iterations={r['iterations']} ({r['stop_reason']})"
+        print(line)
+    if args.output:
+        write_results(records, args.output)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,187 @@
+import math
+from time import perf_counter
+import numpy as np
+from .box import ORIENTATION_AXES, Box, distinct_orientations
+from .boxset import BoxSet
+from .cost_functions import PlacementEngine, is_on_edge, is_small_box, place_box
+
+# 这个文件计算一组箱子和容器的快速下界，用来衡量当前最优解离最优还有多远（optimality gap）：
+#   container_count_bound：多容器模式下至少需要的容器数（体积下界 L1 与“大箱子两两不能共存”下界取最大）
+#   cost_lower_bound：单容器下成本的下界，逐项估计：体积惩罚是精确值，高度惩罚用体积和最短边估计，
+#                     必然落在边缘的小箱子数乘以 1e6，其余奖励项取最好的情况
+# 箱子整体放不下时（总体积超过容器或某个箱子没有能放进去的朝向）下界为 1e12，与 advanced_cost_function 的惩罚一致。
+#
+# 成本中起决定作用的是每个贴边小箱子 1e6 的惩罚（易碎惩罚要求箱子重叠，在合法摆放中总是 0）。
+# 只看几何可行性，这些小箱子几乎总能放进内部，解析下界里的贴边数通常是 0。但优化器能表示的解只有
+# advanced_cost_function 解出来的摆放：箱子按体积稳定降序放置、朝向按固定顺序尝试，
+# 所以一个解只由每个等体积组内不同尺寸箱子的排列决定。min_edge_penalties 在这个解空间上做分支搜索，
+# 得到贴边小箱子数的精确最小值（放置状态相同的分支只展开一次，贴边数不小于已知最优的分支剪掉），
+# 超过 max_nodes 次放置时放弃；这样得到的是模拟退火能达到的成本的下界。
+
+INFEASIBLE = 1e12
+# 分支搜索默认最多尝试的放置次数
+SEARCH_NODES = 1000
+# 与 is_small_box / is_on_edge 的默认参数一致
+SMALL_VOLUME = 10
+EDGE_MARGIN = 1.0
+
+def _dims(boxes):
+    if isinstance(boxes, BoxSet):
+        return boxes.dims
+    return np.array([(b.original_width, b.original_height, b.original_depth) for b in boxes],
+                    dtype=np.float64).reshape(len(boxes), 3)
+
+def _bounds(container):
+    return (container['width'], container['height'], container['depth'])
+
+def _oriented(dims, idx):
+    return tuple(dims[a] for a in ORIENTATION_AXES[idx])
+
+# 每个箱子在容器中可行的朝向尺寸列表
+def _feasible_shapes(dims, container):
+    bounds = _bounds(container)
+    shapes = []
+    for row in dims.tolist():
+        key = tuple(row)
+        shapes.append([_oriented(key, idx) for idx in distinct_orientations(key, bounds)])
+    return shapes
+
+# 体积下界（L1）：ceil(总体积 / 容器体积)
+def volume_bound(boxes, container):
+    dims = _dims(boxes)
+    total = float(np.prod(dims, axis=1).sum())
+    capacity = container['width'] * container['height'] * container['depth']
+    return max(1 if len(dims) else 0, math.ceil(total / capacity - 1e-9))
+
+# 大箱子下界：任意朝向下三边都超过容器对应边一半的箱子，两两之间在任何轴上都错不开，只能各占一个容器
+def large_item_bound(boxes, container):
+    half = [v / 2 for v in _bounds(container)]
+    count = 0
+    for shapes in _feasible_shapes(_dims(boxes), container):
+        if shapes and all(all(s > h for s, h in zip(shape, half)) for shape in shapes):
+            count += 1
+    return count
+
+# 多容器模式至少需要的容器数；container_types 为容器或容器列表（列表时按最大的容器估计体积下界，
+# 大箱子只统计对每种容器都是大箱子的）
+def container_count_bound(boxes, container_types):
+    if isinstance(container_types, dict):
+        container_types = [container_types]
+    largest = max(container_types, key=lambda c: c['width'] * c['height'] * c['depth'])
+    large = min(large_item_bound(boxes, c) for c in container_types)
+    return max(volume_bound(boxes, largest), large)
+
+def _shape_groups(dims):
+    groups = {}
+    for row in dims.tolist():
+        groups.setdefault(row[0] * row[1] * row[2], []).append(tuple(row))
+    return [tuple(sorted(groups[v])) for v in sorted(groups, reverse=True)]
+
+# 搜索用的临时箱子，不占用 Box.counter 的编号
+def _probe(dims):
+    box = Box.__new__(Box)
+    box.box_id = box.unique_id = 0
+    box.original_width, box.original_height, box.original_depth = dims
+    box.width, box.height, box.depth = dims
+    box.is_fragile = False
+    box.x = box.y = box.z = 0
+    return box
+
+def _state_key(k, rest, engine):
+    placed = frozenset((b.x, b.y, b.z, b.width, b.height, b.depth) for b in engine.placed_boxes)
+    return k, rest, placed, frozenset(engine.extreme_points)
+
+# advanced_cost_function 能解出的所有摆放中贴边小箱子数的最小值；所有排列都放不下时返回 math.inf，
+# 搜索超过 max_nodes 次放置或到达 deadline（perf_counter 时刻）时返回 None；
+# 一次完整的搜索至少要放置每个箱子一次，箱子数超过 max_nodes 的一半时直接放弃
+def min_edge_penalties(boxes, container, max_nodes=SEARCH_NODES, deadline=None):
+    dims = _dims(boxes)
+    if not len(dims) or len(dims) * 2 > max_nodes:
+        return None
+    groups = _shape_groups(dims)
+    best = math.inf
+    nodes = 0
+    seen = set()
+    # 栈中每一项：(组下标, 组内还没放的尺寸, 引擎, 已有的贴边数)
+    stack = [(0, groups[0], PlacementEngine(container), 0)]
+    while stack:
+        k, rest, engine, edges = stack.pop()
+        if edges >= best:
+            continue
+        if not rest:
+            if k + 1 == len(groups):
+                best = edges
+                continue
+            k, rest = k + 1, groups[k + 1]
+        key = _state_key(k, rest, engine)
+        if key in seen:
+            continue
+        seen.add(key)
+        children = []
+        for i, dims in enumerate(rest):
+            if i and dims == rest[i - 1]:
+                continue
+            nodes += 1
+            if nodes > max_nodes or (deadline is not None and perf_counter() >= deadline):
+                return None
+            child = engine.copy()
+            box = _probe(dims)
+            if place_box(child, box):
+                edge = 1 if is_small_box(box) and is_on_edge(box, container) else 0
+                children.append((k, rest[:i] + rest[i + 1:], child, edges + edge))
+        stack.extend(reversed(children))
+    return best
+
+# 成本的下界（单容器，全部箱子都要放下）；search_nodes > 0 时再用 min_edge_penalties 收紧贴边惩罚，
+# 这时的下界只对 advanced_cost_function 解出的摆放成立（见文件开头）；deadline 限制搜索的时间
+def cost_lower_bound(boxes, container, search_nodes=0, deadline=None):
+    dims = _dims(boxes)
+    n = len(dims)
+    if n == 0:
+        return INFEASIBLE
+    W, H, D = _bounds(container)
+    capacity = W * H * D
+    volumes = np.prod(dims, axis=1)
+    total = float(volumes.sum())
+    shapes = _feasible_shapes(dims, container)
+    if total > capacity + 1e-9 or any(not s for s in shapes):
+        return INFEASIBLE
+
+    # 小箱子不在边缘，需要某个朝向三边都严格小于容器边长减去两倍边距，并且整个箱子位于内部区域；
+    # 内部区域能容纳的小箱子数不超过按体积从小到大装入的个数
+    interior = [W - 2 * EDGE_MARGIN, H - 2 * EDGE_MARGIN, D - 2 * EDGE_MARGIN]
+    small = volumes < SMALL_VOLUME
+    movable = sorted(float(volumes[i]) for i in np.flatnonzero(small)
+                     if any(all(s < limit for s, limit in zip(shape, interior)) for shape in shapes[i]))
+    room = max(0.0, interior[0]) * max(0.0, interior[1]) * max(0.0, interior[2])
+    inside = 0
+    for v in movable:
+        if v > room:
+            break
+        room -= v
+        inside += 1
+    forced_edge = int(small.sum()) - inside
+    if search_nodes:
+        searched = min_edge_penalties(boxes, container, search_nodes, deadline)
+        if searched == math.inf:
+            return INFEASIBLE
+        if searched is not None:
+            forced_edge = max(forced_edge, searched)
+
+    # 最大深度不小于所有箱子最短可行深度的最大值，也不小于按底面积平铺时的体积高度
+    min_depth = max(min(shape[2] for shape in s) for s in shapes)
+    height_penalty = max(min_depth, total / (W * H)) / D
+    volume_penalty = (capacity - total) / capacity
+    # 奖励项取最好情况：第一个箱子的间隙项总是 +10，其余每个 -5；每个箱子都靠墙（-1）；
+    # 靠墙的箱子与其它每个箱子都算接触，有序对最多 n(n - 1) 个
+    base_bias = 10 - 5 * (n - 1)
+    wall_bonus = -n
+    touching = n * (n - 1)
+    return (base_bias + 0.5 * wall_bonus - 0.1 * touching + 1e6 * forced_edge +
+            2.0 * volume_penalty + 3.0 * height_penalty)
+
+# 相对间隙 (cost - bound) / max(|cost|, 1)；cost 不低于下界时为非负数，等于 0 表示已证明最优
+def optimality_gap(cost, bound):
+    if cost >= INFEASIBLE and bound >= INFEASIBLE:
+        return 0.0
+    return max(0.0, cost - bound) / max(abs(cost), 1.0)
@@ -1,8 +1,35 @@
 # 这个文件定义了一个 Box 类，用于表示一个箱子。每个箱子有唯一的 ID、原始尺寸、当前尺寸、位置和是否易碎等属性。
 # 该类还提供了旋转箱子的方法和复制箱子的方法。箱子的 ID 是自动递增的，确保每个箱子都有唯一的标识符。
 # 该类的设计允许用户创建多个箱子实例，并对它们进行操作，如旋转和复制
+
+from functools import lru_cache
+
+# 六个朝向对应的 (width, height, depth) 取自原始尺寸 (w, h, d) 的下标
+ORIENTATION_AXES = ((0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0))
+
+# 朝向剪枝时允许的尺寸误差，与 PlacementEngine 的候选点过滤一致
+FIT_EPS = 1e-6
+
+# 返回需要尝试的朝向下标：尺寸相同的朝向只保留下标最小的一个（立方体只剩 1 个，两边相等的箱子剩 3 个），
+# bounds 为 (width, height, depth) 时再去掉任一边超出 bounds 的朝向。按尺寸元组缓存，同一种箱子只计算一次
+@lru_cache(maxsize=None)
+def distinct_orientations(dims, bounds=None):
+    seen = set()
+    result = []
+    for idx, axes in enumerate(ORIENTATION_AXES):
+        oriented = tuple(dims[a] for a in axes)
+        if oriented in seen:
+            continue
+        seen.add(oriented)
+        if bounds is not None and any(o > limit + FIT_EPS for o, limit in zip(oriented, bounds)):
+            continue
+        result.append(idx)
+    return tuple(result)
+
 class Box:
     counter = 1
+    __slots__ = ('box_id', 'original_width', 'original_height', 'original_depth', 'is_fragile',
+                 'x', 'y', 'z', 'width', 'height', 'depth', 'unique_id')
 
     def __init__(self, box_id, original_width, original_height, original_depth, is_fragile=False):
         self.box_id = int(box_id)
@@ -16,21 +43,33 @@ class Box:
         self.depth = self.original_depth
         self.unique_id = Box.counter
         Box.counter += 1
-        self.orientation = [
-            (self.original_width, self.original_height, self.original_depth),
-            (self.original_width, self.original_depth, self.original_height),
-            (self.original_height, self.original_width, self.original_depth),
-            (self.original_height, self.original_depth, self.original_width),
-            (self.original_depth, self.original_width, self.original_height),
-            (self.original_depth, self.original_height, self.original_width)
-        ]
+
+    # 朝向列表按需生成，不再在每个实例（以及每次复制）中保存一份
+    @property
+    def orientation(self):
+        dims = (self.original_width, self.original_height, self.original_depth)
+        return [(dims[a], dims[b], dims[c]) for a, b, c in ORIENTATION_AXES]
 
     def rotate(self, idx):
-        self.width, self.height, self.depth = self.orientation[idx]
+        dims = (self.original_width, self.original_height, self.original_depth)
+        a, b, c = ORIENTATION_AXES[idx]
+        self.width, self.height, self.depth = dims[a], dims[b], dims[c]
+
+    # 在 container 中值得尝试的朝向下标（见 distinct_orientations）
+    def feasible_orientations(self, container=None):
+        dims = (self.original_width, self.original_height, self.original_depth)
+        if container is None:
+            return distinct_orientations(dims)
+        return distinct_orientations(dims, (container['width'], container['height'], container['depth']))
 
     def copy(self):
-        new_box = Box(self.box_id, self.original_width, self.original_height, self.original_depth, self.is_fragile)
+        new_box = Box.__new__(Box)
+        new_box.box_id = self.box_id
+        new_box.original_width = self.original_width
+        new_box.original_height = self.original_height
+        new_box.original_depth = self.original_depth
+        new_box.is_fragile = self.is_fragile
         new_box.x, new_box.y, new_box.z = self.x, self.y, self.z
         new_box.width, new_box.height, new_box.depth = self.width, self.height, self.depth
         new_box.unique_id = self.unique_id
-        return new_box
\ No newline at end of file
+        return new_box
@@ -0,0 +1,138 @@
+import numpy as np
+from .box import Box, ORIENTATION_AXES
+from .cost_functions import DeadlineExceeded, advanced_cost_function, _normalize
+
+# 这个文件定义了 BoxSet：用 NumPy 连续数组（struct-of-arrays）保存一批箱子的编号、原始尺寸、是否易碎、
+# 朝向下标和位置。优化过程中的一个解只是一组下标排列 order 加上一个朝向向量 orientation，复制代价很低。
+# 计算成本时复用一组固定的 Box 视图对象，不再为每个候选解重新创建箱子对象。
+
+class BoxSet:
+    def __init__(self, box_ids, widths, heights, depths, is_fragile, unique_ids=None, orientation=None):
+        self.box_ids = np.asarray(box_ids, dtype=np.int64)
+        self.dims = np.column_stack([
+            np.asarray(widths, dtype=np.float64),
+            np.asarray(heights, dtype=np.float64),
+            np.asarray(depths, dtype=np.float64),
+        ]).reshape(len(self.box_ids), 3)
+        self.is_fragile = np.asarray(is_fragile, dtype=bool).reshape(len(self.box_ids))
+        if unique_ids is None:
+            unique_ids = np.arange(1, len(self.box_ids) + 1)
+        self.unique_ids = np.asarray(unique_ids, dtype=np.int64)
+        if orientation is None:
+            orientation = np.zeros(len(self.box_ids))
+        self.orientation = np.asarray(orientation, dtype=np.int8)
+        self._views = None
+
+    @classmethod
+    def from_boxes(cls, boxes):
+        orientation = []
+        for b in boxes:
+            current = (b.width, b.height, b.depth)
+            orientation.append(next((i for i, o in enumerate(b.orientation) if o == current), 0))
+        return cls(
+            [b.box_id for b in boxes],
+            [b.original_width for b in boxes],
+            [b.original_height for b in boxes],
+            [b.original_depth for b in boxes],
+            [b.is_fragile for b in boxes],
+            unique_ids=[b.unique_id for b in boxes],
+            orientation=orientation,
+        )
+
+    def __len__(self):
+        return len(self.box_ids)
+
+    # 不复制视图对象（它们只是计算用的缓冲区）
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_views'] = None
+        return state
+
+    @property
+    def volumes(self):
+        return self.dims[:, 0] * self.dims[:, 1] * self.dims[:, 2]
+
+    # 初始解：原始顺序和原始朝向
+    def initial_state(self):
+        return np.arange(len(self), dtype=np.int64), self.orientation.copy()
+
+    # 按朝向下标返回每个箱子当前的 (width, height, depth)
+    def oriented_dims(self, orientation):
+        axes = np.asarray(ORIENTATION_AXES)[orientation]
+        return np.take_along_axis(self.dims, axes, axis=1)
+
+    # 与 advanced_cost_function 一致的稳定体积降序排列
+    def volume_order(self, order):
+        return order[np.argsort(-self.volumes[order], kind='stable')]
+
+    def signature(self, order, container):
+        ordered = self.volume_order(order)
+        return (
+            (container['width'], container['height'], container['depth']),
+            self.dims[ordered].tobytes(),
+            self.is_fragile[ordered].tobytes(),
+        ), ordered
+
+    def views(self):
+        if self._views is None:
+            self._views = [Box.__new__(Box) for _ in range(len(self))]
+            for i, box in enumerate(self._views):
+                box.box_id = int(self.box_ids[i])
+                box.original_width, box.original_height, box.original_depth = (float(v) for v in self.dims[i])
+                box.is_fragile = bool(self.is_fragile[i])
+                box.unique_id = int(self.unique_ids[i])
+                box.x = box.y = box.z = 0
+                box.rotate(self.orientation[i])
+        return self._views
+
+    # 从缓存中取出一个解的 (cost, layout)，未命中时返回 None
+    def cached(self, order, container, cache):
+        key, ordered = self.signature(order, container)
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        cost, slot_layout = entry
+        layout = np.empty((len(self), 6))
+        layout[ordered] = slot_layout
+        return cost, layout
+
+    def remember(self, order, container, cache, cost, layout):
+        key, ordered = self.signature(order, container)
+        cache.put(key, (cost, layout[ordered]))
+
+    # 计算一个解的成本，返回 (cost, layout)；layout[i] 是第 i 个箱子的 (x, y, z, width, height, depth)
+    # deadline（perf_counter 时刻）到达时停止放置，返回 1e12 和部分布局：没有放下的箱子对应的行为 NaN，结果不写入缓存
+    def evaluate(self, order, orientation, container, cache=None, deadline=None):
+        if cache is not None:
+            hit = self.cached(order, container, cache)
+            if hit is not None:
+                return hit
+
+        views = self.views()
+        boxes = [views[i] for i in order]
+        for i in order:
+            views[i].rotate(orientation[i])
+        try:
+            cost = advanced_cost_function(boxes, container, deadline)
+        except DeadlineExceeded as e:
+            placed = {id(b) for b in e.placed}
+            layout = np.array([(b.x, b.y, b.z, b.width, b.height, b.depth) if id(b) in placed else (np.nan,) * 6
+                               for b in views]).reshape(len(self), 6)
+            return 1e12, layout
+        layout = np.array([(b.x, b.y, b.z, b.width, b.height, b.depth) for b in views]).reshape(len(self), 6)
+        if cache is not None:
+            self.remember(order, container, cache, cost, layout)
+        return cost, layout
+
+    # 把一个解还原成 Box 列表（按 order 排列，带上 layout 中的位置和尺寸）
+    def to_boxes(self, order, layout=None):
+        boxes = []
+        views = self.views()
+        for i in order:
+            box = views[i].copy()
+            if layout is not None:
+                x, y, z, w, h, d = layout[i]
+                box.x, box.y, box.z = _normalize(x), _normalize(y), _normalize(z)
+                box.width, box.height, box.depth = float(w), float(h), float(d)
+            boxes.append(box)
+        return boxes
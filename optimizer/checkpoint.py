@@ -0,0 +1,38 @@
+import os
+import pickle
+import numpy as np
+
+# 这个文件实现了模拟退火的检查点（checkpoint）：当前解、最优解、温度、迭代次数、降温策略和随机数生成器状态
+# 一起序列化到一个文件中，进程被终止后可以从检查点精确地继续运行（结果与不中断时完全相同）。
+# 写入先写临时文件再原子替换，进程在写入过程中被终止也不会留下损坏的检查点。
+# 检查点同时记录容器和影响结果的 SA 参数，换了参数再继续会报错；运行结束时写入的检查点带有停止原因，
+# 再次运行时直接返回其中的结果（明确标记为已完成），不会再继续迭代。
+
+CHECKPOINT_VERSION = 2
+
+def save_checkpoint(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(dict(state, version=CHECKPOINT_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def load_checkpoint(path):
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {state.get('version')}")
+    return state
+
+def container_key(container):
+    return (container['width'], container['height'], container['depth'])
+
+# 检查点只能用于同一组箱子（box_id 和原始尺寸都相同）、同一个容器和同样的 SA 参数
+def check_compatible(state, boxset, container, params, path):
+    if not (np.array_equal(state['box_ids'], boxset.box_ids) and np.array_equal(state['dims'], boxset.dims)):
+        raise ValueError(f"{path} was written for a different set of boxes")
+    if state['container'] != container_key(container):
+        raise ValueError(f"{path} was written for container {state['container']}, not {container_key(container)}")
+    changed = sorted(k for k in set(params) | set(state['params']) if state['params'].get(k) != params.get(k))
+    if changed:
+        raise ValueError(f"{path} was written with different SA parameters ({', '.join(changed)}); "
+                         f"delete it to start a new run")
@@ -0,0 +1,69 @@
+import math
+from collections import deque
+
+# 这个文件实现了模拟退火的降温策略。每个策略的 update(T, accepted, uphill, cost) 在每一步之后调用，返回新的温度。
+# geometric：固定比例 T *= cooling_rate（原来的行为）；
+# acceptance：根据最近 window 次上坡（变差）提议的接受率调整降温速度，接受率高于目标时降温更快，低于目标时更慢；
+# variance：每 window 步为一个链，按链内成本的标准差降温（Aarts & van Laarhoven），成本波动大时降温慢。
+
+class GeometricCooling:
+    def __init__(self, cooling_rate=0.99):
+        self.cooling_rate = cooling_rate
+
+    def update(self, T, accepted, uphill, cost):
+        return T * self.cooling_rate
+
+class AcceptanceRateCooling:
+    def __init__(self, cooling_rate=0.99, target=0.3, window=50, min_speed=0.5, max_speed=4.0):
+        self.cooling_rate = cooling_rate
+        self.target = target
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.history = deque(maxlen=window)
+
+    def update(self, T, accepted, uphill, cost):
+        if uphill:
+            self.history.append(accepted)
+        if not self.history:
+            return T * self.cooling_rate
+        rate = sum(self.history) / len(self.history)
+        # 降温速度限制在 [min_speed, max_speed] 倍之间，保证温度最终会降到 stop_T
+        speed = min(max(rate / self.target, self.min_speed), self.max_speed)
+        return T * self.cooling_rate ** speed
+
+class VarianceCooling:
+    def __init__(self, cooling_rate=0.99, window=50, delta=0.1):
+        self.cooling_rate = cooling_rate
+        self.window = window
+        self.delta = delta
+        self.costs = []
+        self.steps = 0
+
+    def update(self, T, accepted, uphill, cost):
+        self.steps += 1
+        # 不可行解（1e12 惩罚）不计入方差
+        if cost < 1e12:
+            self.costs.append(cost)
+        if self.steps < self.window:
+            return T
+        costs, self.costs, self.steps = self.costs, [], 0
+        mean = sum(costs) / len(costs) if costs else 0
+        sigma = math.sqrt(sum((c - mean) ** 2 for c in costs) / len(costs)) if costs else 0
+        if sigma == 0:
+            return T * self.cooling_rate ** self.window
+        # 每个链至少按固定比例降一次温，避免成本波动很大时温度停滞
+        return min(T / (1 + T * math.log(1 + self.delta) / (3 * sigma)), T * self.cooling_rate)
+
+# 几何降温从 initial_temp 降到 stop_T 需要的步数（默认参数下为 688）
+def geometric_steps(initial_temp=1000, cooling_rate=0.99, stop_T=1):
+    return max(0, math.ceil(math.log(stop_T / initial_temp) / math.log(cooling_rate)))
+
+SCHEDULES = {'geometric': GeometricCooling, 'acceptance': AcceptanceRateCooling, 'variance': VarianceCooling}
+
+# schedule 可以是名称（见 SCHEDULES）或已经创建好的策略对象
+def make_schedule(schedule, cooling_rate=0.99):
+    if isinstance(schedule, str):
+        if schedule not in SCHEDULES:
+            raise ValueError(f"unknown cooling schedule: {schedule}")
+        return SCHEDULES[schedule](cooling_rate)
+    return schedule
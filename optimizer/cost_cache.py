@@ -0,0 +1,65 @@
+from collections import OrderedDict
+import numpy as np
+
+# 这个文件实现了成本函数的记忆化缓存（有界 LRU）。
+# advanced_cost_function 会先按体积对箱子重新排序，并且自己依次尝试 0..5 六个朝向，
+# 所以结果只取决于排序后每个位置上箱子的原始尺寸和是否易碎。交换两个体积相同的箱子、旋转箱子等扰动
+# 往往会得到同一个规范状态，这时直接返回缓存的成本和摆放结果，不再重新模拟放置。
+# 规范状态的键和缓存的内容由 BoxSet.signature / cached / remember 决定，这里只负责按键存取和淘汰。
+# 每个条目保存一整份 n×6 的摆放结果，大小随箱子数增长，所以除了条目数 maxsize 之外还按字节数 max_bytes 限制。
+
+# 估计键或值占用的字节数：NumPy 数组和 bytes 按实际长度，元组逐项相加，其它对象按 8 字节计
+def _nbytes(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, bytes):
+        return len(obj)
+    if isinstance(obj, tuple):
+        return sum(_nbytes(item) for item in obj)
+    return 8
+
+class CostCache:
+    def __init__(self, maxsize=10000, max_bytes=256 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+        self.nbytes = 0
+        self.hits = self.misses = 0
+
+    # 通用接口：按任意可哈希的键读写缓存，get 会更新命中/未命中计数
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    # 超过条目数或字节数上限时淘汰最久没有使用的条目（最新的条目总是保留）
+    def put(self, key, value):
+        if key in self.entries:
+            self.nbytes -= self.sizes[key]
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.sizes[key] = _nbytes(key) + _nbytes(value)
+        self.nbytes += self.sizes[key]
+        while len(self.entries) > 1 and (len(self.entries) > self.maxsize or self.nbytes > self.max_bytes):
+            old, _ = self.entries.popitem(last=False)
+            self.nbytes -= self.sizes.pop(old)
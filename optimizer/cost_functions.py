@@ -1,4 +1,16 @@
 import math
+from bisect import insort
+from time import perf_counter
+import numpy as np
+from . import profiling
+from .heightmap import HeightMap
+from .spatial_index import UniformGrid
+
+# 如果传入的是空间索引，只取出箱子附近（向外扩展 margin）的已放置箱子；否则直接使用列表
+def _nearby(box, placed_boxes, margin=0.0):
+    if isinstance(placed_boxes, UniformGrid):
+        return placed_boxes.near(box, margin)
+    return placed_boxes
 
 # 检查两个箱子是否重叠
 def overlap(box1, box2):
@@ -28,7 +40,7 @@ def overlap_on_xy(b1, b2):
     )
 
 def is_gap_too_large(box, placed_boxes, threshold=1.5):
-    for other in placed_boxes:
+    for other in _nearby(box, placed_boxes, threshold):
         if box == other:
             continue
         if overlap_on_yz(box, other):
@@ -45,7 +57,35 @@ def is_gap_too_large(box, placed_boxes, threshold=1.5):
                 return False
     return True
 
-def support_area_ratio(box, placed_boxes, step=0.5):
+def _point_supported(px, py, pz, placed_boxes):
+    for other in placed_boxes:
+        if (abs(other.y + other.height - py) < 1e-3 and
+            other.x <= px <= other.x + other.width and
+            other.z <= pz <= other.z + other.depth):
+            return True
+    return False
+
+def support_area_ratio(box, placed_boxes, step=0.5, heightmap=None):
+    if isinstance(placed_boxes, UniformGrid):
+        # 只有顶面与箱子底面等高、且在箱子投影范围内的箱子才可能起支撑作用
+        placed_boxes = placed_boxes.query(box.x, box.y - 1e-3, box.z,
+                                          box.x + box.width, box.y, box.z + box.depth)
+
+    # 使用高度图：一次切片比较得到被支撑的采样点数
+    tops = heightmap.footprint(box) if heightmap is not None and heightmap.step == step else None
+    if tops is not None:
+        if tops.size == 0:
+            return 0
+        if abs(box.y) < 1e-3:
+            return 1.0  # 贴地
+        supported = int(np.count_nonzero(np.abs(tops - box.y) < 1e-3))
+        # 最高顶面在箱子上方（悬空箱子遮挡）的采样点，高度图无法判断，逐点检查
+        for i, k in zip(*np.nonzero(tops > box.y + 1e-3)):
+            px = box.x + i * step + step / 2
+            pz = box.z + k * step + step / 2
+            supported += int(_point_supported(px, box.y, pz, placed_boxes))
+        return supported / tops.size
+
     supported = 0
     total = 0
     x_steps = int(box.width / step)
@@ -59,12 +99,7 @@ def support_area_ratio(box, placed_boxes, step=0.5):
             if abs(py) < 1e-3:
                 is_supported = True  # 贴地
             else:
-                for other in placed_boxes:
-                    if (abs(other.y + other.height - py) < 1e-3 and
-                        other.x <= px <= other.x + other.width and
-                        other.z <= pz <= other.z + other.depth):
-                        is_supported = True
-                        break
+                is_supported = _point_supported(px, py, pz, placed_boxes)
             supported += int(is_supported)
             total += 1
     return supported / total if total > 0 else 0
@@ -87,7 +122,7 @@ def is_touching(box, others):
         return True
 
     # 靠近已有箱子：任意一面贴合
-    for other in others:
+    for other in _nearby(box, others, 1e-3):
         if abs(box.x + box.width - other.x) < 1e-3 or abs(other.x + other.width - box.x) < 1e-3:
             if overlap_on_yz(box, other): return True
         if abs(box.y + box.height - other.y) < 1e-3 or abs(other.y + other.height - box.y) < 1e-3:
@@ -97,20 +132,253 @@ def is_touching(box, others):
     return False
 
 
-def try_place_with_contact_priority(box, placed_boxes, container, min_support_ratio=0.9):
-    x_range = list(range(int(container['width'] - box.width + 1)))
-    y_range = list(range(int(container['height'] - box.height + 1)))
-    z_range = list(range(int(container['depth'] - box.depth + 1)))
-
-    positions = [(x, y, z) for y in y_range for z in z_range for x in x_range]
-    positions.sort(key=lambda pos: (pos[0] + pos[1] + pos[2]))
-
-    for x, y, z in positions:
-        box.x, box.y, box.z = x, y, z
-        if all(not overlap(box, other) for other in placed_boxes):
-            if support_area_ratio(box, placed_boxes) >= min_support_ratio:
+# 用 NumPy 广播一次性计算所有箱子两两之间的接触和间隙：
+#   touching_bonus：满足 is_touching(box, [other]) 的有序对 (box, other) 的数量
+#   gap_too_large[k]：等于放置第 k 个箱子时 is_gap_too_large(box, placed_boxes[:k + 1], threshold) 的结果
+# 按行分块计算，避免箱子很多时占用 n² 的内存
+def pairwise_contact_scores(placed_boxes, threshold=1.5):
+    n = len(placed_boxes)
+    lo = np.array([(b.x, b.y, b.z) for b in placed_boxes], dtype=float).reshape(n, 3)
+    hi = np.array([(b.x + b.width, b.y + b.height, b.z + b.depth) for b in placed_boxes], dtype=float).reshape(n, 3)
+    wall = (lo == 0).any(axis=1)
+    touching_bonus = 0
+    gap_too_large = np.ones(n, dtype=bool)
+    block = max(1, 2 ** 20 // max(n, 1))
+    for start in range(0, n, block):
+        end = min(n, start + block)
+        lo_i, hi_i = lo[start:end, None, :], hi[start:end, None, :]
+        lo_j, hi_j = lo[None, :, :], hi[None, :, :]
+        # 每个轴上区间是否重叠，以及两个相对面的距离
+        ov = ~((hi_i <= lo_j) | (hi_j <= lo_i))
+        ov_yz = ov[..., 1] & ov[..., 2]
+        ov_xz = ov[..., 0] & ov[..., 2]
+        ov_xy = ov[..., 0] & ov[..., 1]
+        d1 = np.abs(hi_i - lo_j)
+        d2 = np.abs(hi_j - lo_i)
+
+        contact = (d1 < 1e-3) | (d2 < 1e-3)
+        touch = (contact[..., 0] & ov_yz) | (contact[..., 1] & ov_xz) | (contact[..., 2] & ov_xy)
+        touch |= wall[start:end, None]
+        rows = np.arange(start, end)
+        touch[rows - start, rows] = False
+        touching_bonus += int(touch.sum())
+
+        close = np.minimum(d1, d2) < threshold
+        near = (close[..., 0] & ov_yz) | (close[..., 1] & ov_xz) | (close[..., 2] & ov_xy)
+        # 只和在它之前放置的箱子比较
+        near &= np.arange(n)[None, :] < rows[:, None]
+        gap_too_large[start:end] = ~near.any(axis=1)
+    return touching_bonus, gap_too_large
+
+# 极点比较时使用的浮点容差
+EPS = 1e-6
+
+def _normalize(v):
+    # 整数坐标保持为 int，和原来的整数格点输出一致
+    v = round(float(v), 9)
+    return int(v) if v.is_integer() else v
+
+# 候选点的排序键：x+y+z 从小到大（接触优先），同和时按 (y, z, x)；键中含有点的三个坐标，可以还原出点
+def _point_key(p):
+    return (p[0] + p[1] + p[2], p[1], p[2], p[0])
+
+# 基于极点（extreme point）的放置引擎：
+# 只在已放置箱子产生的角点（及其沿坐标轴的投影）上尝试放置，而不是扫描整个整数格点。
+# 候选点按 _point_key 排序，与原格点扫描的顺序一致；插入时就保持有序（sorted_points），枚举候选点时不再排序。
+# min_side 是之后要放的箱子中最短的边（由调用方通过 set_min_side 给出，默认 0）：任何箱子放在点 p 上都会占据
+# 以 p 为角、边长 min_side 的立方体，这个立方体与已放置的箱子重叠或超出容器的点不可能再被使用，直接删除。
+# blockers 记住每个点上一次挡住候选箱子的已放置箱子（已放置的箱子不会移动），下次先和它比较，
+# 大多数因重叠被拒绝的候选点不必再查询空间索引。
+class PlacementEngine:
+    def __init__(self, container, min_support_ratio=0.9, cell_size=None):
+        self.container = container
+        self.min_support_ratio = min_support_ratio
+        self.placed_boxes = []
+        self.index = UniformGrid(container, cell_size)
+        self.heightmap = HeightMap(container)
+        self.extreme_points = {(0, 0, 0)}
+        self.sorted_points = [_point_key((0, 0, 0))]
+        self.min_side = 0
+        self.blockers = {}
+        # 剩余的空闲体积：箱子体积超过它时任何朝向都放不下
+        self.free_volume = container['width'] * container['height'] * container['depth']
+
+    def candidates(self, box):
+        max_x = self.container['width'] - box.width + EPS
+        max_y = self.container['height'] - box.height + EPS
+        max_z = self.container['depth'] - box.depth + EPS
+        return [(x, y, z) for _, y, z, x in self.sorted_points if x <= max_x and y <= max_y and z <= max_z]
+
+    # 之后要放的箱子的最短边变长时，删除因此不可能再使用的点
+    def set_min_side(self, min_side):
+        if min_side <= self.min_side:
+            return
+        self.min_side = min_side
+        m = min_side
+        dead = {p for p in self.extreme_points if self._out_of_bounds(p)}
+        for p in self.extreme_points - dead:
+            if any(self._blocked(b, [p]) for b in self.index.query(*p, p[0] + m, p[1] + m, p[2] + m)):
+                dead.add(p)
+        self._remove_points(dead)
+
+    # points 中放任何箱子都会与箱子 b 重叠的点（min_side 为 0 时即落在 b 内部或底角上的点）
+    def _blocked(self, b, points):
+        m = self.min_side
+        x0, y0, z0 = b.x, b.y, b.z
+        x1, y1, z1 = b.x + b.width, b.y + b.height, b.z + b.depth
+        if m > 0:
+            return {p for p in points
+                    if p[0] < x1 and p[1] < y1 and p[2] < z1 and p[0] + m > x0 and p[1] + m > y0 and p[2] + m > z0}
+        return {p for p in points if x0 <= p[0] < x1 and y0 <= p[1] < y1 and z0 <= p[2] < z1}
+
+    # 点 p 上连边长 min_side 的立方体都放不进容器（与 candidates 的过滤条件一致）
+    def _out_of_bounds(self, p):
+        m = self.min_side
+        return (p[0] > self.container['width'] - m + EPS or p[1] > self.container['height'] - m + EPS or
+                p[2] > self.container['depth'] - m + EPS)
+
+    def _remove_points(self, dead):
+        if dead:
+            self.extreme_points -= dead
+            self.sorted_points = [k for k in self.sorted_points if (k[3], k[1], k[2]) not in dead]
+            for p in dead:
+                self.blockers.pop(p, None)
+
+    def try_place(self, box):
+        if profiling.active is not None:
+            return self._try_place_profiled(box, profiling.active)
+        for p in self.candidates(box):
+            box.x, box.y, box.z = p
+            if self._blocker(box, p) is None:
+                if support_area_ratio(box, self.index, heightmap=self.heightmap) >= self.min_support_ratio:
+                    return True
+        return False
+
+    # 与放在点 p 上的 box 重叠的一个已放置箱子，没有时返回 None
+    def _blocker(self, box, p):
+        other = self.blockers.get(p)
+        if other is not None and overlap(box, other):
+            return other
+        for other in self.index.near(box):
+            if overlap(box, other):
+                self.blockers[p] = other
+                return other
+        return None
+
+    # 与 try_place 相同，另外记录候选点枚举、重叠检测、支撑采样的耗时，以及每个朝向被拒绝的候选点数
+    def _try_place_profiled(self, box, prof):
+        # 当前尺寸对应的朝向编号（尺寸相同的朝向取第一个）
+        orientation = box.orientation.index((box.width, box.height, box.depth))
+        start = perf_counter()
+        points = self.candidates(box)
+        prof.add_time('candidates', perf_counter() - start)
+        prof.count('candidates_generated', len(points))
+        for p in points:
+            box.x, box.y, box.z = p
+            start = perf_counter()
+            tests = 0
+            free = True
+            cached = self.blockers.get(p)
+            if cached is not None and overlap(box, cached):
+                tests = 1
+                free = False
+                prof.count('blocker_hits')
+            else:
+                for other in self.index.near(box):
+                    tests += 1
+                    if overlap(box, other):
+                        self.blockers[p] = other
+                        free = False
+                        break
+            prof.add_time('overlap', perf_counter() - start)
+            prof.count('overlap_tests', tests)
+            if not free:
+                prof.count(f'rejected_overlap[orientation={orientation}]')
+                continue
+            start = perf_counter()
+            ratio = support_area_ratio(box, self.index, heightmap=self.heightmap)
+            prof.add_time('support', perf_counter() - start)
+            if ratio >= self.min_support_ratio:
+                prof.count('placements')
                 return True
-    return False
+            prof.count(f'rejected_support[orientation={orientation}]')
+        prof.count(f'no_position[orientation={orientation}]')
+        return False
+
+    def add(self, box):
+        self.placed_boxes.append(box)
+        self.free_volume -= box.width * box.height * box.depth
+        self.index.insert(box)
+        self.heightmap.add(box)
+        # 删除被新箱子占据（min_side > 0 时还包括紧挨在它前面、放不下最短边）的极点
+        self._remove_points(self._blocked(box, self.extreme_points))
+        corners = [
+            (box.x + box.width, box.y, box.z),
+            (box.x, box.y + box.height, box.z),
+            (box.x, box.y, box.z + box.depth),
+        ]
+        for i, corner in enumerate(corners):
+            self._add_point(corner)
+            # 沿另外两个坐标轴投影到最近的箱子表面或墙面
+            for axis in range(3):
+                if axis != i:
+                    self._add_point(self._project(corner, axis))
+
+    # 复制引擎（已放置的 Box 对象本身共享，不复制），用于在同一组固定箱子上反复尝试不同的放置
+    def copy(self):
+        new = PlacementEngine.__new__(PlacementEngine)
+        new.container = self.container
+        new.min_support_ratio = self.min_support_ratio
+        new.placed_boxes = list(self.placed_boxes)
+        new.index = self.index.copy()
+        new.heightmap = self.heightmap.copy()
+        new.extreme_points = set(self.extreme_points)
+        new.sorted_points = list(self.sorted_points)
+        new.min_side = self.min_side
+        new.blockers = dict(self.blockers)
+        new.free_volume = self.free_volume
+        return new
+
+    # 额外登记一个候选极点（例如被移走的箱子留下的位置）
+    def add_extreme_point(self, p):
+        self._add_point(p)
+
+    def _add_point(self, p):
+        p = tuple(_normalize(v) for v in p)
+        if (p[0] < self.container['width'] and
+                p[1] < self.container['height'] and
+                p[2] < self.container['depth'] and
+                p not in self.extreme_points and not self._out_of_bounds(p) and
+                not any(self._blocked(b, [p]) for b in self.index.query(*p, *(v + self.min_side for v in p)))):
+            self.extreme_points.add(p)
+            insort(self.sorted_points, _point_key(p))
+
+    def _project(self, p, axis):
+        best = 0
+        # 只查询从墙面到该点的这一条线段附近的箱子
+        lo = list(p)
+        lo[axis] = 0
+        for b in self.index.query(*lo, *p):
+            b_lo = (b.x, b.y, b.z)
+            b_hi = (b.x + b.width, b.y + b.height, b.z + b.depth)
+            if b_hi[axis] > p[axis] + EPS:
+                continue
+            if all(b_lo[a] <= p[a] < b_hi[a] for a in range(3) if a != axis):
+                best = max(best, b_hi[axis])
+        projected = list(p)
+        projected[axis] = best
+        return tuple(projected)
+
+# 尝试将箱子放置在容器中（接触优先）
+# 只在已放置箱子构成的极点上尝试，支持非整数尺寸。placed_boxes 可以直接传入 PlacementEngine（逐个放置时复用，
+# 放下后由调用方 add），这时 container 和 min_support_ratio 以引擎为准；传入列表时每次重新建立引擎，代价与箱子数成正比
+def try_place_with_contact_priority(box, placed_boxes, container, min_support_ratio=0.9):
+    if isinstance(placed_boxes, PlacementEngine):
+        return placed_boxes.try_place(box)
+    engine = PlacementEngine(container, min_support_ratio)
+    for other in placed_boxes:
+        engine.add(other)
+    return engine.try_place(box)
 
 # 检查箱子是否小于给定体积
 def is_small_box(box, threshold_volume=10):
@@ -125,66 +393,101 @@ def is_on_edge(box, container, margin=1.0):
             box.y + box.height >= container['height'] - margin or
             box.z + box.depth >= container['depth'] - margin)
 
-# 计算成本函数
-def advanced_cost_function(order, container):
+# 按 advanced_cost_function 的规则放置一个箱子：只尝试互不相同且放得进容器的朝向（按尺寸缓存），
+# 取第一个能放下的朝向；剩余体积不够时直接判定放不下。放下时加入 engine 并返回 True
+def place_box(engine, box):
+    prof = profiling.active
+    orientations = box.feasible_orientations(engine.container)
+    if box.original_width * box.original_height * box.original_depth > engine.free_volume + EPS:
+        orientations = ()
+    if prof is not None:
+        prof.count('orientations_pruned', 6 - len(orientations))
+    for orientation in orientations:
+        box.rotate(orientation)
+        if engine.try_place(box):
+            if prof is None:
+                engine.add(box)
+            else:
+                with prof.phase('extreme_points'):
+                    engine.add(box)
+            return True
+    return False
+
+# 带期限的解码在期限到达时抛出，placed 为已经放下的箱子
+class DeadlineExceeded(Exception):
+    def __init__(self, placed):
+        super().__init__(f'deadline reached after placing {len(placed)} boxes')
+        self.placed = placed
+
+# 计算成本函数；deadline（perf_counter 时刻）不为 None 时，每放一个箱子前检查，到期抛出 DeadlineExceeded
+def advanced_cost_function(order, container, deadline=None):
     # 按照体积从大到小排序箱子
-    order = sorted(order, key=lambda b: b.width * b.height * b.depth, reverse=True)
+    order = sorted(order, key=lambda b: b.original_width * b.original_height * b.original_depth, reverse=True)
+
+    prof = profiling.active
+    if prof is not None:
+        prof.count('cost_evaluations')
+    engine = PlacementEngine(container)
+    placed_boxes = engine.placed_boxes
+    # remaining[i]：第 i 个及之后的箱子中最短的边，用来删除不可能再使用的极点
+    remaining = [min(b.original_width, b.original_height, b.original_depth) for b in order]
+    for i in range(len(remaining) - 2, -1, -1):
+        remaining[i] = min(remaining[i], remaining[i + 1])
+
+    for box, min_side in zip(order, remaining):
+        if deadline is not None and perf_counter() >= deadline:
+            raise DeadlineExceeded(placed_boxes)
+        engine.set_min_side(min_side)
+        # 如果没有找到合适的放置位置，则返回一个很大的惩罚值
+        if not place_box(engine, box):
+            if prof is not None:
+                prof.count('unplaceable_boxes')
+            return 1e12  # hard penalty
 
-    placed_boxes = []
+    if deadline is not None and perf_counter() >= deadline:
+        raise DeadlineExceeded(placed_boxes)
+    cost = layout_cost(placed_boxes, container, engine.index)
+    placed_boxes.sort(key=lambda b: (b.y, b.z, b.x))
+    return cost
+
+# 计算一个已经摆放好的方案的成本（placed_boxes 按放置顺序），各项与 advanced_cost_function 完全相同；
+# index 为可选的空间索引，用于易碎箱子的检查
+def layout_cost(placed_boxes, container, index=None):
+    if not placed_boxes:
+        return 1e12
+    nearby = index if index is not None else placed_boxes
     total_volume = 0
     total_x = total_y = total_z = 0
     fragile_penalty = 0
     edge_penalty = 0
-    base_bias_penalty = 0
     wall_bonus = 0
     slope_penalty_total = 0
     max_z = 0
 
-    for box in order:
-        placed = False
-        for orientation in range(6):
-            box.rotate(orientation)
-            if try_place_with_contact_priority(box, placed_boxes, container):
-                placed_boxes.append(box)
-                total_volume += box.width * box.height * box.depth
-                total_x += box.x + box.width / 2
-                total_y += box.y + box.height / 2
-                total_z += box.z + box.depth / 2
-                max_z = max(max_z, box.z + box.depth)
-
-                # 控制斜率（不希望太陡）
-                slope_penalty_total += max(0, box.y - 0.5 * (box.x + box.z))
-
-                # 计算易碎箱子的惩罚
-                if box.is_fragile:
-                    if any(overlap(other, box) and other.z > box.z for other in placed_boxes if other != box):
-                        fragile_penalty += 1e6
-
-                # 计算小箱子在边缘的惩罚
-                if is_small_box(box) and is_on_edge(box, container):
-                    edge_penalty += 1e6
-
-                # 计算基础偏差惩罚 （越靠近原点惩罚越小）
-                if is_gap_too_large(box, placed_boxes):
-                    base_bias_penalty += 10
-                else:
-                    base_bias_penalty -= 5
-
-                # 如果箱子放在墙边，给予奖励
-                if box.x == 0 or box.y == 0 or box.z == 0:
-                    wall_bonus -= 1.0
-                else:
-                    wall_bonus += 2.0
-
-                placed = True
-                break
+    for box in placed_boxes:
+        total_volume += box.width * box.height * box.depth
+        total_x += box.x + box.width / 2
+        total_y += box.y + box.height / 2
+        total_z += box.z + box.depth / 2
+        max_z = max(max_z, box.z + box.depth)
 
-        # 如果没有找到合适的放置位置，则返回一个很大的惩罚值
-        if not placed:
-            return 1e12  # hard penalty
+        # 控制斜率（不希望太陡）
+        slope_penalty_total += max(0, box.y - 0.5 * (box.x + box.z))
 
-    if not placed_boxes:
-        return 1e12
+        # 计算易碎箱子的惩罚
+        if box.is_fragile:
+            if any(overlap(other, box) and other.z > box.z for other in _nearby(box, nearby) if other is not box):
+                fragile_penalty += 1e6
+
+        # 计算小箱子在边缘的惩罚
+        if is_small_box(box) and is_on_edge(box, container):
+            edge_penalty += 1e6
+
+        # 如果箱子放在墙边，给予奖励
+        if box.x == 0 or box.y == 0 or box.z == 0:
+            wall_bonus -= 1.0
+        else:
+            wall_bonus += 2.0
 
     # 计算中心惩罚
     center_x = container['width'] / 2
@@ -203,14 +506,14 @@ def advanced_cost_function(order, container):
     # 计算高度惩罚
     height_penalty = max_z / container['depth']
 
-    # 计算接触奖励
-    touching_bonus = 0
-    for i, box in enumerate(placed_boxes):
-        for j, other in enumerate(placed_boxes):
-            if i != j and is_touching(box, [other]):
-                touching_bonus += 1
-
-    placed_boxes.sort(key=lambda b: (b.y, b.z, b.x))
+    # 计算接触奖励和基础偏差惩罚（越靠近原点惩罚越小），两两之间的比较一次性向量化完成
+    prof = profiling.active
+    if prof is None:
+        touching_bonus, gap_too_large = pairwise_contact_scores(placed_boxes)
+    else:
+        with prof.phase('gap_and_touching'):
+            touching_bonus, gap_too_large = pairwise_contact_scores(placed_boxes)
+    base_bias_penalty = 10 * int(gap_too_large.sum()) - 5 * int((~gap_too_large).sum())
 
     # 计算总惩罚
     return (
@@ -223,4 +526,4 @@ def advanced_cost_function(order, container):
         2.0 * volume_penalty +
         3.0 * height_penalty +
         2.0 * center_penalty
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,158 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .solution_io import load_solution, solution_columns
+
+# 这个文件实现了按列（columnar）计算的放置结果评估引擎。
+# 一个结果文件只读取一次，转换成 NumPy 列；所有指标（包括原来需要两两比较的易碎箱支撑和底面支撑）都用向量化运算计算。
+# evaluate_files 可以一次评估任意多个结果文件，文件较多时使用进程池并行。
+
+COLUMNS = ('x', 'y', 'z', 'width', 'height', 'depth')
+
+# 读取一个结果文件，返回列字典：box_id、x/y/z/width/height/depth（保持文件中的数值类型）和 is_fragile（bool）
+# .npy 二进制结果通过内存映射直接读取，其余按 CSV 解析
+def load_result(path):
+    if str(path).endswith('.npy'):
+        return solution_columns(load_solution(path))
+    df = pd.read_csv(path, skipinitialspace=True)
+    columns = {name: pd.to_numeric(df[name]).to_numpy() for name in COLUMNS}
+    columns['box_id'] = df['box_id'].to_numpy(dtype=np.int64)
+    if 'is_fragile' in df:
+        fragile = df['is_fragile'].replace({'True': 1, 'False': 0}).fillna(0)
+        columns['is_fragile'] = fragile.astype(float).to_numpy() == 1
+    else:
+        columns['is_fragile'] = np.zeros(len(df), dtype=bool)
+    return columns
+
+# 按不带扩展名的路径查找结果文件：优先二进制 .npy，其次 CSV；都不存在时返回 None
+def find_result(stem):
+    for ext in ('.npy', '.csv'):
+        if os.path.exists(stem + ext):
+            return stem + ext
+    return None
+
+# 多容器模式的结果按容器拆分为 <stem>_1、<stem>_2 ……；按编号返回各个容器的结果文件（同样优先 .npy）
+def find_split_results(stem):
+    paths = []
+    while True:
+        path = find_result(f'{stem}_{len(paths) + 1}')
+        if path is None:
+            return paths
+        paths.append(path)
+
+# 多容器模式下各个容器的尺寸按编号保存在 <stem>_containers.json，评估时每个容器用自己的尺寸
+def save_split_containers(stem, containers):
+    with open(f'{stem}_containers.json', 'w') as f:
+        json.dump(list(containers), f)
+
+# 读取 save_split_containers 保存的容器列表；文件不存在时返回 None
+def load_split_containers(stem):
+    path = f'{stem}_containers.json'
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+# 对每一对 (i, j)：j 的底面是否正好贴在 i 的顶面上，且两者在 x、z 方向上有重叠（i != j）。分块计算以限制内存
+def _stacked_pairs(cols, rows, block=None):
+    x, y, z = cols['x'], cols['y'], cols['z']
+    w, h, d = cols['width'], cols['height'], cols['depth']
+    n = len(x)
+    block = block or max(1, 2 ** 20 // max(n, 1))
+    for start in range(0, len(rows), block):
+        i = rows[start:start + block, None]
+        on_top = (
+            (y[None, :] == y[i] + h[i]) &
+            ~((x[None, :] + w[None, :] <= x[i]) | (x[None, :] >= x[i] + w[i])) &
+            ~((z[None, :] + d[None, :] <= z[i]) | (z[None, :] >= z[i] + d[i]))
+        )
+        on_top[np.arange(len(i)), i[:, 0]] = False
+        yield i[:, 0], on_top
+
+# 易碎箱子上方是否没有放置体积 >= threshold_volume 的箱子
+def fragile_boxes_supported(cols, threshold_volume=10):
+    volume = cols['width'] * cols['height'] * cols['depth']
+    heavy = volume >= threshold_volume
+    fragile = np.nonzero(cols['is_fragile'])[0]
+    for _, on_top in _stacked_pairs(cols, fragile):
+        if (on_top & heavy[None, :]).any():
+            return False
+    return True
+
+# 底面贴地或下方有箱子直接支撑的箱子所占百分比
+def proportion_supported(cols):
+    n = len(cols['y'])
+    if n == 0:
+        return 0.0
+    supported = cols['y'] == 0
+    # 转置关系：箱子 j 被 i 支撑 <=> i 在 j 下方
+    for _, on_top in _stacked_pairs(cols, np.arange(n)):
+        supported |= on_top.any(axis=0)
+    return round(float(supported.sum()) / n * 100, 2)
+
+def _on_walls(cols, container):
+    return (
+        (cols['x'] == 0) | (cols['y'] == 0) | (cols['z'] == 0) |
+        (cols['x'] + cols['width'] == container['width']) |
+        (cols['y'] + cols['height'] == container['height']) |
+        (cols['z'] + cols['depth'] == container['depth'])
+    )
+
+# 计算一个结果的全部指标，返回与原评估报告相同字段的字典
+def evaluate(cols, container, strategy=None, fragile_threshold=10, small_volume=10):
+    container_volume = container['width'] * container['height'] * container['depth']
+    volume = cols['width'] * cols['height'] * cols['depth']
+    total_box_volume = volume.sum().item()
+    on_walls = _on_walls(cols, container)
+
+    cx, cz = container['width'] / 2, container['depth'] / 2
+    offsets = np.sqrt((cols['x'] + cols['width'] / 2 - cx) ** 2 + (cols['z'] + cols['depth'] / 2 - cz) ** 2)
+    n = len(volume)
+
+    return {
+        'Strategy': strategy,
+        'Container Volume': container_volume,
+        'Total Box Volume': total_box_volume,
+        'Space Utilization (%)': round((total_box_volume / container_volume) * 100, 2),
+        'Boxes Against Walls': int(on_walls.sum()),
+        'Fragile Boxes Supported': 'Yes' if fragile_boxes_supported(cols, fragile_threshold) else 'No',
+        'Proportion Supported (%)': proportion_supported(cols),
+        'Small Boxes on Edges': int(((volume < small_volume) & on_walls).sum()),
+        'Maximum Stack Height': (cols['y'] + cols['height']).max().item() if n else 0,
+        'Center Offset': round(float(offsets.sum()) / n, 2) if n else 0.0,
+    }
+
+def evaluate_file(path, container, strategy=None, **kwargs):
+    return evaluate(load_result(path), container, strategy if strategy is not None else path, **kwargs)
+
+def _evaluate_task(args):
+    path, container, strategy, kwargs = args
+    return evaluate_file(path, container, strategy, **kwargs)
+
+# 评估多个结果文件。paths 可以是路径列表，也可以是 {策略名: 路径} 字典；返回每个文件的指标字典列表（顺序与输入一致）
+# options 为 {策略名: 参数} 字典，覆盖个别文件的评估参数（例如 fragile_threshold，或用 container 指定这个文件的容器）
+def evaluate_files(paths, container, workers=None, parallel_threshold=8, options=None, **kwargs):
+    items = list(paths.items()) if isinstance(paths, dict) else [(p, p) for p in paths]
+    options = options or {}
+    tasks = []
+    for name, path in items:
+        file_kwargs = dict(kwargs, **options.get(name, {}))
+        tasks.append((path, file_kwargs.pop('container', container), name, file_kwargs))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(tasks) < parallel_threshold:
+        return [_evaluate_task(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_evaluate_task, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+def print_report(result):
+    print("==== Evaluation Report ====")
+    print(f"Space Utilization (%):        {result['Space Utilization (%)']}")
+    print(f"Boxes Against Walls:          {result['Boxes Against Walls']}")
+    print(f"Fragile Boxes Supported:      {result['Fragile Boxes Supported']}")
+    print(f"Proportion Supported (%):     {result['Proportion Supported (%)']}")
+    print(f"Small Boxes on Edges:         {result['Small Boxes on Edges']}")
+    print(f"Maximum Stack Height:         {result['Maximum Stack Height']}")
+    print(f"Average Center Offset:        {result['Center Offset']}")
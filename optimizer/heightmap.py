@@ -0,0 +1,44 @@
+import math
+import numpy as np
+
+# 这个文件实现了容器的顶面高度图（height map）。容器底面按 step 划分成网格，
+# 每个网格记录覆盖其中心点的已放置箱子的最高顶面高度。放置箱子时增量更新，
+# 计算支撑面积时只需对箱子底面对应的切片做一次向量化比较。
+class HeightMap:
+    def __init__(self, container, step=0.5):
+        self.step = step
+        nx = math.ceil(container['width'] / step)
+        nz = math.ceil(container['depth'] / step)
+        self.top = np.zeros((nx, nz))
+        self.centers_x = (np.arange(nx) + 0.5) * step
+        self.centers_z = (np.arange(nz) + 0.5) * step
+
+    def copy(self):
+        new = HeightMap.__new__(HeightMap)
+        new.step = self.step
+        new.top = self.top.copy()
+        new.centers_x = self.centers_x
+        new.centers_z = self.centers_z
+        return new
+
+    # 网格中心落在箱子底面闭区间内的网格，都用箱子的顶面高度更新
+    def add(self, box):
+        i0 = np.searchsorted(self.centers_x, box.x, side='left')
+        i1 = np.searchsorted(self.centers_x, box.x + box.width, side='right')
+        k0 = np.searchsorted(self.centers_z, box.z, side='left')
+        k1 = np.searchsorted(self.centers_z, box.z + box.depth, side='right')
+        region = self.top[i0:i1, k0:k1]
+        np.maximum(region, box.y + box.height, out=region)
+
+    # 返回箱子底面采样点对应的网格切片；箱子不与网格对齐或超出容器时返回 None
+    def footprint(self, box):
+        i0 = box.x / self.step
+        k0 = box.z / self.step
+        if abs(i0 - round(i0)) > 1e-9 or abs(k0 - round(k0)) > 1e-9:
+            return None
+        i0, k0 = int(round(i0)), int(round(k0))
+        i1 = i0 + int(box.width / self.step)
+        k1 = k0 + int(box.depth / self.step)
+        if i0 < 0 or k0 < 0 or i1 > self.top.shape[0] or k1 > self.top.shape[1]:
+            return None
+        return self.top[i0:i1, k0:k1]
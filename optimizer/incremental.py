@@ -0,0 +1,160 @@
+import argparse
+import math
+import random
+import time
+from .box import Box
+from .cost_functions import EPS, PlacementEngine, layout_cost, overlap, support_area_ratio
+from .evaluation import load_result
+from .manifest import load_boxes
+from .sa_optimizer import simulated_annealing
+from .solution_io import export_csv, save_solution_binary, solution_to_array
+
+# 这个文件实现了增量重新装箱：在已有的放置结果（例如之前的 sa_output.csv / .npy）上增加或移除少量箱子。
+# 未受影响的箱子保持原位置不动；失去支撑的箱子和新增的箱子作为变化部分（delta），
+# 只把 delta 放进固定箱子留下的空间，然后只对 delta 的放置顺序和朝向做一次短的低温退火。
+# delta 放不下时退回到完整的模拟退火。
+
+def _volume(box):
+    return box.original_width * box.original_height * box.original_depth
+
+def boxes_from_result(cols):
+    boxes = []
+    rows = zip(cols['box_id'].tolist(), cols['x'].tolist(), cols['y'].tolist(), cols['z'].tolist(),
+               cols['width'].tolist(), cols['height'].tolist(), cols['depth'].tolist(), cols['is_fragile'].tolist())
+    for box_id, x, y, z, w, h, d, fragile in rows:
+        box = Box(box_id, w, h, d, fragile)
+        box.x, box.y, box.z = x, y, z
+        boxes.append(box)
+    return boxes
+
+# 箱子在原位置是否仍然有效：不越界、不与已固定的箱子重叠、底面支撑足够
+def _still_fits(engine, box):
+    c = engine.container
+    if (box.x < -EPS or box.y < -EPS or box.z < -EPS or box.x + box.width > c['width'] + EPS or
+            box.y + box.height > c['height'] + EPS or box.z + box.depth > c['depth'] + EPS):
+        return False
+    if any(overlap(box, other) for other in engine.index.near(box)):
+        return False
+    return support_area_ratio(box, engine.index, heightmap=engine.heightmap) >= engine.min_support_ratio
+
+# 先尝试首选朝向，再按下标顺序尝试其余互不相同且放得进容器的朝向
+def _place(engine, box, preferred):
+    feasible = box.feasible_orientations(engine.container)
+    for orientation in [preferred] + [o for o in feasible if o != preferred]:
+        box.rotate(orientation)
+        if engine.try_place(box):
+            engine.add(box)
+            return True
+    return False
+
+# 在固定箱子（base）上按 order 依次放置 delta，返回新的引擎；有箱子放不下时返回 None
+def _place_delta(base, delta, order, preferred):
+    engine = base.copy()
+    for i in order:
+        if not _place(engine, delta[i], preferred[i]):
+            return None
+    return engine
+
+def _cost(engine):
+    return 1e12 if engine is None else layout_cost(engine.placed_boxes, engine.container, engine.index)
+
+# previous 可以是结果文件路径（.csv / .npy）或已放置的 Box 列表；added 为新增的 Box 列表，removed 为要移除的 box_id。
+# 返回 {'boxes', 'cost', 'mode', 'fixed', 'replaced'}：mode 为 'incremental' 或 'full'（退回完整退火），
+# fixed 为保持原位的箱子数，replaced 为重新放置的箱子数。time_budget（秒）同时限制低温退火和退回的完整退火
+def repack_incremental(previous, container, added=(), removed=(), refine_iter=100, refine_temp=10.0,
+                       cooling_rate=0.95, time_budget=None, min_support_ratio=0.9, rng=None, **sa_kwargs):
+    start = time.perf_counter()
+    rng = rng or random.Random()
+    if isinstance(previous, str) or hasattr(previous, '__fspath__'):
+        boxes = boxes_from_result(load_result(previous))
+    else:
+        boxes = [b.copy() for b in previous]
+    removed = set(removed)
+    unknown = removed - {b.box_id for b in boxes}
+    if unknown:
+        raise ValueError(f"cannot remove unknown box ids: {sorted(unknown)}")
+    # 新增箱子的 id 不能与保留的箱子或其他新增箱子重复（可以复用被移除的 id）
+    kept = {b.box_id for b in boxes} - removed
+    added_ids = [b.box_id for b in added]
+    duplicate = {i for i in added_ids if i in kept or added_ids.count(i) > 1}
+    if duplicate:
+        raise ValueError(f"added box ids already in use: {sorted(duplicate)}")
+
+    # 从下往上检查剩下的箱子，原位置仍然有效的就固定下来
+    base = PlacementEngine(container, min_support_ratio)
+    displaced = []
+    for box in sorted((b for b in boxes if b.box_id not in removed), key=lambda b: (b.y, b.z, b.x)):
+        if _still_fits(base, box):
+            base.add(box)
+        else:
+            displaced.append(box)
+    # 被移走的箱子留下的位置也作为候选极点
+    for box in boxes:
+        if box.box_id in removed:
+            base.add_extreme_point((box.x, box.y, box.z))
+
+    delta = [b.copy() for b in added] + displaced
+    order = sorted(range(len(delta)), key=lambda i: _volume(delta[i]), reverse=True)
+    preferred = [0] * len(delta)
+    cost = _cost(_place_delta(base, delta, order, preferred))
+    if cost >= 1e12:
+        everything = [b for b in boxes if b.box_id not in removed] + [b.copy() for b in added]
+        if time_budget is not None:
+            sa_kwargs['time_budget'] = max(0.0, time_budget - (time.perf_counter() - start))
+        solution, cost = simulated_annealing(everything, container, rng=rng, verbose=False, **sa_kwargs)
+        return {'boxes': solution, 'cost': cost, 'mode': 'full', 'fixed': 0, 'replaced': len(everything)}
+
+    # 低温退火：只改变 delta 的放置顺序（交换）和首选朝向
+    best_order, best_preferred, best_cost = order, preferred, cost
+    T = refine_temp
+    for _ in range(refine_iter if delta else 0):
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            break
+        n_order, n_preferred = list(order), list(preferred)
+        if len(delta) >= 2 and rng.random() < 0.5:
+            i, j = rng.sample(range(len(delta)), 2)
+            n_order[i], n_order[j] = n_order[j], n_order[i]
+        else:
+            n_preferred[rng.randrange(len(delta))] = rng.randrange(6)
+        n_cost = _cost(_place_delta(base, delta, n_order, n_preferred))
+        delta_cost = n_cost - cost
+        if delta_cost < 0 or rng.random() < math.exp(-delta_cost / T):
+            order, preferred, cost = n_order, n_preferred, n_cost
+            if cost < best_cost:
+                best_order, best_preferred, best_cost = order, preferred, cost
+        T *= cooling_rate
+
+    # delta 中的 Box 对象在尝试中被反复修改，最后按最优的顺序和朝向重新放置一次
+    engine = _place_delta(base, delta, best_order, best_preferred)
+    return {'boxes': engine.placed_boxes, 'cost': best_cost, 'mode': 'incremental',
+            'fixed': len(base.placed_boxes), 'replaced': len(delta)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Repack an existing placement after adding or removing boxes')
+    parser.add_argument('previous', help='previous placement result (.csv or .npy)')
+    parser.add_argument('--add', default=None, help='manifest CSV with the boxes to add')
+    parser.add_argument('--remove', type=int, nargs='*', default=[], help='box ids to remove')
+    parser.add_argument('--container', type=float, nargs=3, metavar=('WIDTH', 'HEIGHT', 'DEPTH'), required=True)
+    parser.add_argument('--refine-iter', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--time-budget', type=float, default=None, help='wall-clock limit in seconds')
+    parser.add_argument('--output', required=True, help='where to write the new placement (.npy or .csv)')
+    args = parser.parse_args(argv)
+    container = dict(zip(('width', 'height', 'depth'), args.container))
+    added = load_boxes(args.add) if args.add else []
+    start = time.perf_counter()
+    try:
+        result = repack_incremental(args.previous, container, added, args.remove, refine_iter=args.refine_iter,
+                                    time_budget=args.time_budget, rng=random.Random(args.seed))
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{result['mode']} repack: fixed={result['fixed']}, replaced={result['replaced']}, "
+          f"cost={result['cost']:.2f}, time={time.perf_counter() - start:.3f}s")
+    if args.output.endswith('.npy'):
+        save_solution_binary(result['boxes'], args.output)
+    else:
+        export_csv(solution_to_array(result['boxes']), args.output)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
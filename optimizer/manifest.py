@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from .box import Box
+from .boxset import BoxSet
+
+# 这个文件实现了箱子清单（manifest）的列式读取：CSV 直接按固定类型读成 NumPy 数组，
+# 支持分块（流式）读取很大的清单，并批量创建 Box 或 BoxSet，不再逐行 iterrows。
+
+MANIFEST_COLUMNS = ('box_id', 'width', 'height', 'depth', 'is_fragile')
+MANIFEST_DTYPES = {'box_id': np.int64, 'width': np.float64, 'height': np.float64, 'depth': np.float64,
+                   'is_fragile': np.float64}
+
+def _to_columns(df):
+    return {
+        'box_id': df['box_id'].to_numpy(dtype=np.int64),
+        'width': df['width'].to_numpy(dtype=np.float64),
+        'height': df['height'].to_numpy(dtype=np.float64),
+        'depth': df['depth'].to_numpy(dtype=np.float64),
+        # 缺失的 is_fragile 视为 0
+        'is_fragile': np.nan_to_num(df['is_fragile'].to_numpy(dtype=np.float64)).astype(np.int64) != 0,
+    }
+
+def _read(path, **kwargs):
+    return pd.read_csv(path, usecols=list(MANIFEST_COLUMNS), dtype=MANIFEST_DTYPES, engine='c', **kwargs)
+
+# 分块读取清单，每次产生一个列字典（每块最多 chunksize 行）
+def iter_manifest(path, chunksize=100000):
+    for df in _read(path, chunksize=chunksize):
+        yield _to_columns(df)
+
+# 一次读取整个清单；chunksize 不为 None 时分块读取后拼接，降低解析时的峰值内存
+def read_manifest(path, chunksize=None):
+    if chunksize is None:
+        return _to_columns(_read(path))
+    chunks = list(iter_manifest(path, chunksize))
+    if not chunks:
+        return _to_columns(_read(path))
+    return {name: np.concatenate([c[name] for c in chunks]) for name in MANIFEST_COLUMNS}
+
+# 由列字典批量创建 Box，unique_id 从 start_id 开始连续编号
+def boxes_from_columns(cols, start_id=1):
+    boxes = [Box.__new__(Box) for _ in range(len(cols['box_id']))]
+    rows = zip(boxes, cols['box_id'].tolist(), cols['width'].tolist(), cols['height'].tolist(),
+               cols['depth'].tolist(), cols['is_fragile'].tolist())
+    for uid, (box, box_id, w, h, d, fragile) in enumerate(rows, start_id):
+        box.box_id = box_id
+        box.original_width = box.width = w
+        box.original_height = box.height = h
+        box.original_depth = box.depth = d
+        box.is_fragile = fragile
+        box.x = box.y = box.z = 0
+        box.unique_id = uid
+    Box.counter = start_id + len(boxes)
+    return boxes
+
+def boxset_from_columns(cols):
+    return BoxSet(cols['box_id'], cols['width'], cols['height'], cols['depth'], cols['is_fragile'])
+
+def load_boxes(path, chunksize=None):
+    return boxes_from_columns(read_manifest(path, chunksize))
+
+def load_boxset(path, chunksize=None):
+    return boxset_from_columns(read_manifest(path, chunksize))
@@ -0,0 +1,119 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from .bounds import container_count_bound
+from .cost_functions import PlacementEngine
+from .parallel import restart_seeds
+from .sa_optimizer import simulated_annealing
+
+# 这个文件实现了多容器装箱模式：当一个容器放不下时自动打开新的容器（同尺寸或多种尺寸），而不是直接返回 1e12。
+# 第一步用首次适应递减（first-fit decreasing）把箱子分配到尽量少的容器中，并尝试清空装载最少的容器；
+# 有多种容器尺寸时，打开新容器选择按剩余箱子试装后填充率最高（浪费最少）的尺寸；
+# 第二步对每个容器内的箱子分别运行模拟退火，各容器在进程池中并行优化。
+
+def _volume(box):
+    return box.original_width * box.original_height * box.original_depth
+
+# 与 advanced_cost_function 相同：依次尝试互不相同且放得进该容器的朝向
+def _try_place(engine, box):
+    for orientation in box.feasible_orientations(engine.container):
+        box.rotate(orientation)
+        if engine.try_place(box):
+            return True
+    return False
+
+# 用 box 和其后还没分配的箱子（按首次适应）试装一个新容器，返回填充率
+def _fill_ratio(container, box, remaining, min_support_ratio):
+    engine = PlacementEngine(container, min_support_ratio)
+    for other in [box.copy()] + [b.copy() for b in remaining]:
+        if _try_place(engine, other):
+            engine.add(other)
+    capacity = container['width'] * container['height'] * container['depth']
+    return sum(_volume(b) for b in engine.placed_boxes) / capacity
+
+# 打开一个能放下 box 的新容器；有多种尺寸时选择试装后填充率最高的（同样高时按列表顺序）
+def _open_container(box, container_types, min_support_ratio, remaining=()):
+    fitting = []
+    for container in container_types:
+        engine = PlacementEngine(container, min_support_ratio)
+        if _try_place(engine, box):
+            fitting.append(container)
+    if not fitting:
+        raise ValueError(f"box {box.box_id} does not fit in any container type")
+    container = fitting[0]
+    if len(fitting) > 1:
+        container = max(fitting, key=lambda c: _fill_ratio(c, box, remaining, min_support_ratio))
+    engine = PlacementEngine(container, min_support_ratio)
+    _try_place(engine, box)
+    engine.add(box)
+    return engine
+
+def _repack(boxes, container, min_support_ratio):
+    engine = PlacementEngine(container, min_support_ratio)
+    for box in sorted(boxes, key=_volume, reverse=True):
+        if not _try_place(engine, box):
+            return None
+        engine.add(box)
+    return engine
+
+# 把箱子分配到容器中，返回 [(container, boxes)]。container_types 可以是一个容器或容器列表，
+# 打开新容器时选择浪费最少的尺寸（见 _open_container）
+def assign_containers(boxes, container_types, min_support_ratio=0.9):
+    if isinstance(container_types, dict):
+        container_types = [container_types]
+    engines = []
+    ordered = sorted((b.copy() for b in boxes), key=_volume, reverse=True)
+    for i, box in enumerate(ordered):
+        for engine in engines:
+            if _try_place(engine, box):
+                engine.add(box)
+                break
+        else:
+            engines.append(_open_container(box, container_types, min_support_ratio, ordered[i + 1:]))
+
+    # 尝试清空装载体积最小的容器：把它的箱子放进其它容器（其它容器整体重新摆放）
+    while len(engines) > 1:
+        engines.sort(key=lambda e: sum(_volume(b) for b in e.placed_boxes), reverse=True)
+        last = engines[-1]
+        moved = [b.copy() for b in last.placed_boxes]
+        repacked = list(engines[:-1])
+        for box in moved:
+            for k, engine in enumerate(repacked):
+                candidate = _repack([b.copy() for b in engine.placed_boxes] + [box], engine.container,
+                                    min_support_ratio)
+                if candidate is not None:
+                    repacked[k] = candidate
+                    break
+            else:
+                repacked = None
+                break
+        if repacked is None:
+            break
+        engines = repacked
+
+    return [(engine.container, list(engine.placed_boxes)) for engine in engines]
+
+def _optimize_container(args):
+    container, boxes, seed, sa_kwargs = args
+    return simulated_annealing(boxes, container, rng=random.Random(seed), verbose=False, **sa_kwargs)
+
+# 多容器装箱：先分配容器，再并行优化每个容器内的摆放。返回 [{'container', 'boxes', 'cost'}]，按容器编号排列
+def pack_multi_container(boxes, container_types, workers=None, seed=None, min_support_ratio=0.9, **sa_kwargs):
+    assignment = assign_containers(boxes, container_types, min_support_ratio)
+    bound = container_count_bound(boxes, container_types)
+    print(f"Assigned {len(boxes)} boxes to {len(assignment)} container(s) (lower bound {bound})")
+    seeds = restart_seeds(seed, len(assignment))
+    tasks = [(container, group, s, sa_kwargs) for (container, group), s in zip(assignment, seeds)]
+    if workers is None:
+        workers = min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1:
+        results = list(map(_optimize_container, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_optimize_container, tasks))
+
+    packed = []
+    for k, ((container, _), (solution, cost)) in enumerate(zip(assignment, results)):
+        print(f"[Container {k + 1}/{len(assignment)}] Boxes={len(solution)}, Cost={cost:.2f}")
+        packed.append({'container': container, 'boxes': solution, 'cost': cost})
+    return packed
@@ -0,0 +1,45 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .sa_optimizer import simulated_annealing
+
+# 这个文件实现了多起点（multi-start）并行模拟退火：多次独立的重启分布到进程池中执行。
+# 每次重启都有自己独立播种的随机数流（由 SeedSequence 派生），所以给定 seed 时结果可复现，且与进程数无关。
+# 子进程只把各自的最优解和成本返回给主进程。
+
+def restart_seeds(seed, runs):
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(runs)]
+
+def _run_restart(args):
+    boxes, container, seed, sa_kwargs = args
+    rng = random.Random(seed)
+    return simulated_annealing(boxes, container, rng=rng, verbose=False, **sa_kwargs)
+
+# checkpoint_dir 不为 None 时，每次重启使用自己的检查点文件 run_<i>.ckpt；重新执行同样的调用会从检查点继续，已完成的重启直接返回
+def multi_start(boxes, container, runs=5, workers=None, seed=None, checkpoint_dir=None, **sa_kwargs):
+    if workers is None:
+        workers = min(runs, os.cpu_count() or 1)
+    tasks = [(boxes, container, s, _with_checkpoint(sa_kwargs, checkpoint_dir, i))
+             for i, s in enumerate(restart_seeds(seed, runs))]
+
+    if workers <= 1:
+        results = map(_run_restart, tasks)
+        return _pick_best(results)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _pick_best(executor.map(_run_restart, tasks))
+
+def _with_checkpoint(sa_kwargs, checkpoint_dir, i):
+    if checkpoint_dir is None:
+        return sa_kwargs
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    return dict(sa_kwargs, checkpoint=os.path.join(checkpoint_dir, f'run_{i + 1}.ckpt'))
+
+# 成本相同时保留编号最小的重启，保证结果与完成顺序无关
+def _pick_best(results):
+    best_solution, best_cost = None, float('inf')
+    for i, (solution, cost) in enumerate(results):
+        print(f"[SA Run {i + 1}] Cost={cost:.2f}")
+        if cost < best_cost:
+            best_solution, best_cost = solution, cost
+    return best_solution, best_cost
@@ -0,0 +1,98 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from .boxset import BoxSet
+from .cost_cache import CostCache
+from .parallel import restart_seeds
+from .sa_optimizer import apply_move, propose_move, undo_move
+
+# 这个文件实现了并行回火（parallel tempering / replica exchange）优化器。
+# 多个副本在不同的固定温度下各自运行 propose_move / apply_move + advanced_cost_function 的 Metropolis 循环（在子进程中执行），
+# 每运行 swap_interval 步后，相邻温度的副本按 Metropolis 准则交换状态。
+# 副本状态是 BoxSet 上的 (order, orientation) 数组，在进程之间传递的代价很小。
+# 返回值与 simulated_annealing 相同：(best_solution, best_cost)。
+# 每个工作进程只有一个成本缓存（在进程池的初始化函数中创建），同一个进程运行的所有段和副本共用它。
+
+_worker_cache = None
+
+def _init_worker():
+    global _worker_cache
+    _worker_cache = CostCache()
+
+def temperature_ladder(n_replicas, t_min, t_max):
+    if n_replicas == 1:
+        return [t_min]
+    ratio = (t_max / t_min) ** (1 / (n_replicas - 1))
+    return [t_min * ratio ** i for i in range(n_replicas)]
+
+# 在固定温度 T 下运行 steps 步，返回当前状态、该段的最优状态以及随机数状态
+def _run_segment(args):
+    boxset, state, cost, T, steps, rng_state, container = args
+    rng = random.Random()
+    rng.setstate(rng_state)
+    cache = _worker_cache
+    order, orientation = state[0].copy(), state[1].copy()
+    best_state, best_cost, best_layout = state, cost, None
+    for _ in range(steps):
+        move = propose_move(order, orientation, rng)
+        apply_move(order, orientation, move)
+        neighbor_cost, layout = boxset.evaluate(order, orientation, container, cache)
+        delta = neighbor_cost - cost
+        if delta < 0 or rng.random() < math.exp(-delta / T):
+            cost = neighbor_cost
+            if cost < best_cost:
+                best_state, best_cost, best_layout = (order.copy(), orientation.copy()), cost, layout
+        else:
+            undo_move(order, orientation, move)
+    return (order, orientation), cost, best_state, best_cost, best_layout, rng.getstate()
+
+def parallel_tempering(boxes, container, n_replicas=4, t_min=1, t_max=1000, swap_interval=50, rounds=20,
+                       workers=None, seed=None, verbose=True):
+    if workers is None:
+        workers = min(n_replicas, os.cpu_count() or 1)
+    temperatures = temperature_ladder(n_replicas, t_min, t_max)
+    seeds = restart_seeds(seed, n_replicas + 1)
+    swap_rng = random.Random(seeds[-1])
+    rng_states = [random.Random(s).getstate() for s in seeds[:-1]]
+
+    boxset = boxes if isinstance(boxes, BoxSet) else BoxSet.from_boxes(boxes)
+    initial = boxset.initial_state()
+    initial_cost, initial_layout = boxset.evaluate(*initial, container)
+    states = [initial] * n_replicas
+    costs = [initial_cost] * n_replicas
+    best_order, best_layout, best_cost = initial[0], initial_layout, initial_cost
+
+    # 单进程运行时各段在本进程内执行，同样只用一个缓存
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    else:
+        executor = None
+        _init_worker()
+    try:
+        for r in range(rounds):
+            tasks = [(boxset, states[i], costs[i], temperatures[i], swap_interval, rng_states[i], container)
+                     for i in range(n_replicas)]
+            results = executor.map(_run_segment, tasks) if executor else map(_run_segment, tasks)
+            for i, (state, cost, seg_best, seg_best_cost, seg_layout, rng_state) in enumerate(results):
+                states[i], costs[i], rng_states[i] = state, cost, rng_state
+                if seg_best_cost < best_cost:
+                    best_order, best_layout, best_cost = seg_best[0], seg_layout, seg_best_cost
+
+            # 相邻温度的副本交换状态（偶数轮交换 0-1, 2-3...，奇数轮交换 1-2, 3-4...）
+            swaps = 0
+            for i in range(r % 2, n_replicas - 1, 2):
+                j = i + 1
+                exponent = (costs[i] - costs[j]) * (1 / temperatures[i] - 1 / temperatures[j])
+                if exponent >= 0 or swap_rng.random() < math.exp(exponent):
+                    states[i], states[j] = states[j], states[i]
+                    costs[i], costs[j] = costs[j], costs[i]
+                    swaps += 1
+
+            if verbose:
+                print(f"Round {r}: Costs={[round(c, 2) for c in costs]}, Swaps={swaps}, Best={best_cost:.2f}")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    return boxset.to_boxes(best_order, best_layout), best_cost
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+# 这个文件实现了可选的性能剖析（profiling）层：按阶段记录耗时和调用次数，并统计重叠检测次数、各朝向被拒绝的候选点数等计数器。
+# 默认关闭：热路径中只读取一次模块变量 active 并判断是否为 None，关闭时几乎没有开销，可以保留在生产代码中。
+# 开启方式：profiling.enable()、with profiling.profile()、simulated_annealing(..., profile=True)，或设置环境变量 OPTIMIZER_PROFILE=1。
+# 注意：只记录当前进程；进程池中的子进程不会汇总到主进程。
+
+# 当前启用的 Profiler，关闭时为 None
+active = None
+
+class Profiler:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+
+    def add_time(self, phase, seconds):
+        self.seconds[phase] += seconds
+        self.calls[phase] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    # 返回普通字典：{'phases': {阶段: {'calls', 'seconds'}}, 'counters': {名称: 次数}}
+    def snapshot(self):
+        return {
+            'phases': {name: {'calls': self.calls[name], 'seconds': self.seconds[name]}
+                       for name in sorted(self.seconds)},
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def report(self, file=None):
+        file = file or sys.stdout
+        print("==== Profile ====", file=file)
+        for name, stats in self.snapshot()['phases'].items():
+            print(f"{name:<28} calls={stats['calls']:<10} time={stats['seconds']:.4f}s", file=file)
+        for name, value in self.snapshot()['counters'].items():
+            print(f"{name:<28} {value}", file=file)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+def enable(profiler=None):
+    global active
+    active = profiler if profiler is not None else Profiler()
+    return active
+
+def disable():
+    global active
+    active = None
+
+# 在 with 块内启用剖析，结束后恢复原来的状态
+@contextmanager
+def profile(profiler=None):
+    global active
+    previous = active
+    current = enable(profiler)
+    try:
+        yield current
+    finally:
+        active = previous
+
+if os.environ.get('OPTIMIZER_PROFILE'):
+    enable()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+from .cost_functions import _normalize
+
+# 这个文件实现了持久化的、按内容寻址的结果缓存：同一组箱子（尺寸和易碎属性的多重集合，与 box_id 和顺序无关）、
+# 同一个容器和同一组优化参数，直接返回之前保存的最优解，并把 box_id 重新映射到新清单中的箱子。
+# 每个结果是缓存目录中的一个 .npz 文件，文件名为规范哈希。写入先写临时文件再原子替换，同一台机器上多个进程同时写入是安全的；
+# 目录总大小超过 max_bytes 时按最近使用时间（mtime，命中时更新）删除最旧的文件。
+
+# 一个箱子的规范键：排序后的三边长度和是否易碎（任意朝向都可以由 6 个朝向之一得到）
+def _box_key(box):
+    return tuple(sorted((box.original_width, box.original_height, box.original_depth))) + (bool(box.is_fragile),)
+
+def manifest_hash(boxes, container, params=None):
+    payload = {
+        'boxes': sorted(_box_key(b) for b in boxes),
+        'container': [container['width'], container['height'], container['depth']],
+        'params': params or {},
+    }
+    text = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+class ResultCache:
+    def __init__(self, directory, max_bytes=256 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    # 命中时返回 (solution, cost)，solution 是 boxes 中箱子的副本，按保存时的放置顺序排列、位置和朝向已设置好
+    def get(self, boxes, container, params=None):
+        path = self.path(manifest_hash(boxes, container, params))
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                keys, layout, cost = data['keys'], data['layout'], float(data['cost'])
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        solution = _remap(boxes, keys, layout)
+        if solution is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return solution, cost
+
+    # 不保存不可行的结果（1e12 惩罚）
+    def put(self, boxes, container, params, solution, cost):
+        if cost >= 1e12:
+            return
+        path = self.path(manifest_hash(boxes, container, params))
+        keys = np.array([_box_key(b) for b in solution], dtype=np.float64).reshape(len(solution), 4)
+        layout = np.array([(b.x, b.y, b.z, b.width, b.height, b.depth) for b in solution],
+                          dtype=np.float64).reshape(len(solution), 6)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, keys=keys, layout=layout, cost=np.float64(cost))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    # 目录总大小超过上限时，从最久未使用的文件开始删除；其它进程可能同时在删除，文件已不存在时忽略
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+# 把保存的布局分配给新清单中规范键相同的箱子（同一键内按输入顺序），并旋转到保存时的尺寸
+def _remap(boxes, keys, layout):
+    groups = {}
+    for box in boxes:
+        groups.setdefault(_box_key(box), []).append(box)
+    for group in groups.values():
+        group.reverse()
+    solution = []
+    for key, (x, y, z, w, h, d) in zip(keys.tolist(), layout.tolist()):
+        group = groups.get((key[0], key[1], key[2], bool(key[3])))
+        if not group:
+            return None
+        box = group.pop().copy()
+        orientation = next((i for i, o in enumerate(box.orientation) if o == (w, h, d)), None)
+        if orientation is None:
+            return None
+        box.rotate(orientation)
+        box.x, box.y, box.z = _normalize(x), _normalize(y), _normalize(z)
+        solution.append(box)
+    if any(groups.values()):
+        return None
+    return solution
+
+# 先查缓存，未命中时调用 optimize() 得到 (solution, cost) 并保存
+def cached_optimize(cache, boxes, container, params, optimize):
+    hit = cache.get(boxes, container, params)
+    if hit is not None:
+        return hit
+    solution, cost = optimize()
+    cache.put(boxes, container, params, solution, cost)
+    return solution, cost
@@ -1,52 +1,337 @@
+import os
 import random
 import math
-from .cost_functions import advanced_cost_function
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from . import profiling
+from .boxset import BoxSet
+from .bounds import SEARCH_NODES, cost_lower_bound, optimality_gap
+from .checkpoint import check_compatible, container_key, load_checkpoint, save_checkpoint
+from .cooling import make_schedule
+from .cost_cache import CostCache
 
-def perturb(solution):
-    new_solution = [b.copy() for b in solution]
-    op = random.choice(["swap", "rotate", "move"])
+# 在 (order, orientation) 表示的解上做扰动：交换、旋转或移动，返回新的数组（原数组不变）
+# rng 可以是 random 模块本身或独立的 random.Random 实例
+def perturb_state(order, orientation, rng=random):
+    op = rng.choice(["swap", "rotate", "move"])
+    n = len(order)
 
-    if op == "swap" and len(new_solution) >= 2:
-        i, j = random.sample(range(len(new_solution)), 2)
-        new_solution[i], new_solution[j] = new_solution[j], new_solution[i]
+    if op == "swap" and n >= 2:
+        i, j = rng.sample(range(n), 2)
+        order = order.copy()
+        order[i], order[j] = order[j], order[i]
 
     elif op == "rotate":
-        i = random.randint(0, len(new_solution) - 1)
-        new_solution[i].rotate(random.randint(0, 5))
+        i = rng.randint(0, n - 1)
+        orientation = orientation.copy()
+        orientation[order[i]] = rng.randint(0, 5)
 
-    elif op == "move" and len(new_solution) >= 2:
-        i = random.randint(0, len(new_solution) - 1)
-        box = new_solution.pop(i)
-        new_solution.insert(random.randint(0, len(new_solution)), box)
+    elif op == "move" and n >= 2:
+        i = rng.randint(0, n - 1)
+        item = order[i]
+        order = np.delete(order, i)
+        order = np.insert(order, rng.randint(0, n - 1), item)
 
-    return new_solution
+    return order, orientation
+
+# 原地修改的邻域：一个 move 只是一个小元组，apply_move 原地修改 order / orientation，被拒绝时用 undo_move 还原
+#   ("swap", i, j)            交换 order 中的两个位置
+#   ("rotate", box, old, new) 修改第 box 个箱子的朝向
+#   ("move", i, j)            把位置 i 的箱子移到位置 j
+# 随机数的消耗顺序与 perturb_state 相同
+def propose_move(order, orientation, rng=random):
+    op = rng.choice(["swap", "rotate", "move"])
+    n = len(order)
+
+    if op == "swap" and n >= 2:
+        i, j = rng.sample(range(n), 2)
+        return ("swap", i, j)
+
+    elif op == "rotate":
+        box = order[rng.randint(0, n - 1)]
+        return ("rotate", box, orientation[box], rng.randint(0, 5))
+
+    elif op == "move" and n >= 2:
+        i = rng.randint(0, n - 1)
+        return ("move", i, rng.randint(0, n - 1))
+
+    return None
+
+def _shift(order, i, j):
+    item = order[i]
+    if i < j:
+        order[i:j] = order[i + 1:j + 1]
+    elif i > j:
+        order[j + 1:i + 1] = order[j:i]
+    order[j] = item
+
+def apply_move(order, orientation, move):
+    if move is None:
+        return
+    op = move[0]
+    if op == "swap":
+        _, i, j = move
+        order[i], order[j] = order[j], order[i]
+    elif op == "rotate":
+        orientation[move[1]] = move[3]
+    elif op == "move":
+        _shift(order, move[1], move[2])
+
+def undo_move(order, orientation, move):
+    if move is None:
+        return
+    op = move[0]
+    if op == "swap":
+        _, i, j = move
+        order[i], order[j] = order[j], order[i]
+    elif op == "rotate":
+        orientation[move[1]] = move[2]
+    elif op == "move":
+        _shift(order, move[2], move[1])
+
+_worker_boxset = None
+
+def _init_worker(boxset):
+    global _worker_boxset
+    _worker_boxset = boxset
+
+def _evaluate_state(args):
+    order, orientation, container = args
+    return _worker_boxset.evaluate(order, orientation, container)
+
+# 一次评估一批邻居状态：先查缓存，未命中的交给进程池（或在本进程内）计算，返回 [(cost, layout)]
+def evaluate_batch(boxset, states, container, cache, executor=None):
+    results = [boxset.cached(order, container, cache) for order, _ in states]
+    pending = [i for i, r in enumerate(results) if r is None]
+    if executor:
+        evaluated = executor.map(_evaluate_state, [(*states[i], container) for i in pending])
+    else:
+        evaluated = (boxset.evaluate(*states[i], container) for i in pending)
+    for i, (cost, layout) in zip(pending, evaluated):
+        boxset.remember(states[i][0], container, cache, cost, layout)
+        results[i] = (cost, layout)
+    return results
 
 # 这个文件实现了模拟退火算法，用于优化箱子的放置。它使用了一个成本函数来评估当前的放置方案，并通过随机扰动来寻找更好的解决方案。
-def simulated_annealing(boxes, container, initial_temp=1000, cooling_rate=0.99, stop_T=1, max_iter=10000):
-    current_solution = [b.copy() for b in boxes]
-    current_cost = advanced_cost_function(current_solution, container)
-    best_solution = [b.copy() for b in current_solution]
-    best_cost = current_cost
-
-    T = initial_temp
-    iteration = 0
-
-    while T > stop_T and iteration < max_iter:
-        neighbor = perturb(current_solution)
-        neighbor_cost = advanced_cost_function(neighbor, container)
-
-        delta = neighbor_cost - current_cost
-        if delta < 0 or random.random() < math.exp(-delta / T):
-            current_solution = [b.copy() for b in neighbor]
-            current_cost = neighbor_cost
-            if current_cost < best_cost:
-                best_solution = [b.copy() for b in neighbor]
-                best_cost = current_cost
-
-        if iteration % 100 == 0:
-            print(f"Iter {iteration}: Temp={T:.2f}, Cost={current_cost:.2f}, Best={best_cost:.2f}")
-
-        T *= cooling_rate
-        iteration += 1
-
-    return best_solution, best_cost
\ No newline at end of file
+# 箱子在内部转换成 BoxSet，一个解只是下标排列和朝向向量，最后才还原成 Box 列表。boxes 也可以直接传入 BoxSet。
+# cache 为 CostCache 实例，用于跳过已经评估过的规范状态；调用方可以传入自己的实例来读取命中/未命中计数
+# rng 为独立的随机数生成器（默认使用全局 random），verbose=False 时不打印进度
+# batch_size > 1 时每一步生成 batch_size 个邻居一起评估（workers > 1 时使用进程池），取其中成本最低的邻居做接受判断
+# profile=True 或传入一个 profiling.Profiler 时，在本次运行中启用性能剖析，结束时（verbose）打印各阶段耗时和计数；
+# 之后可以用 Profiler.snapshot() / dump(path) 取出数据。全局已启用剖析时也会在结束时打印
+# time_budget（秒）不为 None 时按墙钟时间运行：温度按已用时间比例从 initial_temp 几何下降到 stop_T，到期即停止；
+# max_iter=None 表示不限迭代次数。callback(progress) 在每次找到更优解时调用（progress 见 AnnealProgress），返回 True 时提前结束
+# schedule 为降温策略（'geometric'、'acceptance'、'variance' 或 cooling.py 中的策略对象；按时间运行时不使用）；
+# stagnation_window 不为 None 时，最优成本连续这么多步没有改进就提前停止
+# checkpoint 为检查点文件路径：每 checkpoint_every 步和结束时写入；文件已存在时从中精确地继续运行，
+# 已经结束的检查点直接返回其中的结果；箱子、容器或 SA 参数与检查点不一致时抛出 ValueError（见 checkpoint.py）
+# gap_tolerance 不为 None 时，最优成本与下界（见 bounds.py，此时在优化器的解空间上搜索贴边惩罚）的相对间隙不超过它就提前停止
+def simulated_annealing(boxes, container, initial_temp=1000, cooling_rate=0.99, stop_T=1, max_iter=10000, cache=None,
+                        rng=None, verbose=True, batch_size=1, workers=1, profile=None, time_budget=None,
+                        callback=None, schedule='geometric', stagnation_window=None, checkpoint=None,
+                        checkpoint_every=500, gap_tolerance=None):
+    kwargs = dict(initial_temp=initial_temp, cooling_rate=cooling_rate, stop_T=stop_T, max_iter=max_iter, cache=cache,
+                  rng=rng, verbose=verbose, batch_size=batch_size, workers=workers, time_budget=time_budget,
+                  schedule=schedule, stagnation_window=stagnation_window, checkpoint=checkpoint,
+                  checkpoint_every=checkpoint_every, gap_tolerance=gap_tolerance)
+    if profile:
+        with profiling.profile(profile if isinstance(profile, profiling.Profiler) else None) as prof:
+            best = _run(boxes, container, callback, kwargs)
+    else:
+        prof = profiling.active
+        best = _run(boxes, container, callback, kwargs)
+    if prof is not None and verbose:
+        prof.report()
+    return best.solution(), best.best_cost
+
+def _run(boxes, container, callback, kwargs):
+    best = None
+    for progress in iter_annealing(boxes, container, **kwargs):
+        best = progress
+        if callback is not None and callback(progress):
+            break
+    return best
+
+# 模拟退火过程中的最优解快照；solution() 按需还原成 Box 列表
+# stop_reason 在运行中为 None，最后一个快照中为停止原因：'temperature'、'max_iter'、'time_budget'、'stagnation' 或 'gap'
+# lower_bound 为成本下界，gap 为最优成本与它的相对间隙
+class AnnealProgress:
+    __slots__ = ('iteration', 'temperature', 'elapsed', 'current_cost', 'best_cost', 'stop_reason', 'lower_bound',
+                 '_boxset', '_order', '_layout')
+
+    def __init__(self, iteration, temperature, elapsed, current_cost, best_cost, boxset, order, layout,
+                 stop_reason=None, lower_bound=None):
+        self.iteration = iteration
+        self.temperature = temperature
+        self.elapsed = elapsed
+        self.current_cost = current_cost
+        self.best_cost = best_cost
+        self.stop_reason = stop_reason
+        self.lower_bound = lower_bound
+        self._boxset = boxset
+        self._order = order
+        self._layout = layout
+
+    @property
+    def gap(self):
+        return None if self.lower_bound is None else optimality_gap(self.best_cost, self.lower_bound)
+
+    def solution(self):
+        return self._boxset.to_boxes(self._order, self._layout)
+
+# 随时可用（anytime）接口：生成器，开始时、每次找到更优解时以及结束时产生一个 AnnealProgress；最后产生的就是最终结果。
+# 调用方可以随时停止迭代，已经拿到的最优解始终有效。参数与 simulated_annealing 相同
+def iter_annealing(boxes, container, initial_temp=1000, cooling_rate=0.99, stop_T=1, max_iter=10000, cache=None,
+                   rng=None, verbose=True, batch_size=1, workers=1, time_budget=None, schedule='geometric',
+                   stagnation_window=None, checkpoint=None, checkpoint_every=500, gap_tolerance=None):
+    if cache is None:
+        cache = CostCache()
+    if rng is None:
+        rng = random
+    start = time.perf_counter()
+    boxset = boxes if isinstance(boxes, BoxSet) else BoxSet.from_boxes(boxes)
+    # 需要按间隙停止时才做分支搜索收紧下界（见 bounds.py）；按时间运行时搜索最多占用四分之一的时间
+    deadline = None if time_budget is None else start + time_budget
+    bound = cost_lower_bound(boxset, container, SEARCH_NODES if gap_tolerance is not None else 0,
+                             None if deadline is None else start + time_budget / 4)
+    # 影响结果的参数，写入检查点，继续运行时必须一致
+    params = dict(initial_temp=initial_temp, cooling_rate=cooling_rate, stop_T=stop_T, max_iter=max_iter,
+                  batch_size=batch_size, time_budget=time_budget,
+                  schedule=schedule if isinstance(schedule, str) else type(schedule).__name__,
+                  stagnation_window=stagnation_window, gap_tolerance=gap_tolerance)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        # 从检查点继续：恢复全部状态，不重新评估初始解
+        state = load_checkpoint(checkpoint)
+        check_compatible(state, boxset, container, params, checkpoint)
+        if state['stop_reason'] is not None:
+            if verbose:
+                print(f"{checkpoint} is a finished run ({state['stop_reason']}), returning its result")
+            yield AnnealProgress(state['iteration'], state['T'], state['elapsed'], state['current_cost'],
+                                 state['best_cost'], boxset, state['best_order'], state['best_layout'],
+                                 state['stop_reason'], bound)
+            return
+        order, orientation, current_cost = state['order'], state['orientation'], state['current_cost']
+        best_order, best_orientation = state['best_order'], state['best_orientation']
+        best_layout, best_cost = state['best_layout'], state['best_cost']
+        T, iteration, last_improvement = state['T'], state['iteration'], state['last_improvement']
+        cooling, step_time = state['cooling'], state['step_time']
+        rng.setstate(state['rng_state'])
+        start -= state['elapsed']
+        if deadline is not None:
+            deadline -= state['elapsed']
+        if verbose:
+            print(f"Resumed from {checkpoint} at iteration {iteration}")
+    else:
+        order, orientation = boxset.initial_state()
+        # 按时间运行时初始解也受期限约束：箱子很多、期限内放不完时，最优解只包含已经放下的箱子（成本 1e12），随后立即停止
+        current_cost, layout = boxset.evaluate(order, orientation, container, cache, deadline)
+        # 单步耗时的估计（指数滑动平均），初始值取第一次完整评估的耗时；剩余时间不够再走一步时提前停止，不超过期限
+        step_time = time.perf_counter() - start
+        # 只为最优解保存快照
+        best_order, best_orientation, best_layout = order.copy(), orientation.copy(), layout
+        if np.isnan(layout[:, 0]).any():
+            best_order = order[~np.isnan(layout[order, 0])]
+        best_cost = current_cost
+
+        T = initial_temp
+        iteration = last_improvement = 0
+        cooling = make_schedule(schedule, cooling_rate)
+
+    def save(stop_reason=None):
+        save_checkpoint(checkpoint, {
+            'box_ids': boxset.box_ids, 'dims': boxset.dims, 'container': container_key(container), 'params': params,
+            'stop_reason': stop_reason,
+            'order': order, 'orientation': orientation, 'current_cost': current_cost,
+            'best_order': best_order, 'best_orientation': best_orientation, 'best_layout': best_layout,
+            'best_cost': best_cost, 'T': T, 'iteration': iteration, 'last_improvement': last_improvement,
+            'cooling': cooling, 'step_time': step_time, 'rng_state': rng.getstate(),
+            'elapsed': time.perf_counter() - start,
+        })
+
+    yield AnnealProgress(iteration, T, time.perf_counter() - start, current_cost, best_cost, boxset, best_order,
+                         best_layout, lower_bound=bound)
+    if max_iter is None:
+        max_iter = float('inf')
+    # 按时间运行时温度由进度 t ∈ [0, 1] 决定：T = initial_temp * (final_T / initial_temp) ** t
+    final_T = max(stop_T, 1e-3)
+    executor = None
+    if batch_size > 1 and workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(boxset,))
+
+    try:
+        while True:
+            if iteration >= max_iter:
+                stop_reason = 'max_iter'
+                break
+            if gap_tolerance is not None and optimality_gap(best_cost, bound) <= gap_tolerance:
+                stop_reason = 'gap'
+                break
+            if stagnation_window is not None and iteration - last_improvement >= stagnation_window:
+                stop_reason = 'stagnation'
+                break
+            if time_budget is None:
+                if T <= stop_T:
+                    stop_reason = 'temperature'
+                    break
+            else:
+                now = time.perf_counter()
+                elapsed = now - start
+                if elapsed + step_time >= time_budget:
+                    stop_reason = 'time_budget'
+                    break
+                t = max(elapsed / time_budget, iteration / max_iter)
+                T = initial_temp * (final_T / initial_temp) ** t
+
+            if batch_size > 1:
+                states = [perturb_state(order, orientation, rng) for _ in range(batch_size)]
+                results = evaluate_batch(boxset, states, container, cache, executor)
+                k = min(range(batch_size), key=lambda i: results[i][0])
+                (n_order, n_orientation), (neighbor_cost, n_layout) = states[k], results[k]
+                move = None
+            else:
+                move = propose_move(order, orientation, rng)
+                apply_move(order, orientation, move)
+                neighbor_cost, n_layout = boxset.evaluate(order, orientation, container, cache, deadline)
+
+            improved = False
+            delta = neighbor_cost - current_cost
+            accepted = delta < 0 or rng.random() < math.exp(-delta / T)
+            if accepted:
+                if batch_size > 1:
+                    order, orientation = n_order, n_orientation
+                current_cost = neighbor_cost
+                if current_cost < best_cost:
+                    best_order, best_orientation, best_layout = order.copy(), orientation.copy(), n_layout
+                    best_cost = current_cost
+                    improved = True
+            else:
+                undo_move(order, orientation, move)
+
+            if verbose and iteration % 100 == 0:
+                print(f"Iter {iteration}: Temp={T:.2f}, Cost={current_cost:.2f}, Best={best_cost:.2f}")
+
+            if time_budget is None:
+                T = cooling.update(T, accepted, delta > 0, current_cost)
+            else:
+                step_time = 0.8 * step_time + 0.2 * (time.perf_counter() - now)
+            iteration += 1
+            if improved:
+                last_improvement = iteration
+            if checkpoint is not None and iteration % checkpoint_every == 0:
+                save()
+            if improved:
+                yield AnnealProgress(iteration, T, time.perf_counter() - start, current_cost, best_cost, boxset,
+                                     best_order, best_layout, lower_bound=bound)
+    finally:
+        if executor:
+            executor.shutdown()
+    if checkpoint is not None:
+        save(stop_reason)
+    if verbose:
+        print(f"Cost cache: hits={cache.hits}, misses={cache.misses}, hit rate={cache.hit_rate:.1%}")
+        print(f"Stopped after {iteration} iterations ({stop_reason}), best cost={best_cost:.2f} "
+              f"found at iteration {last_improvement}")
+        print(f"Lower bound={bound:.2f}, gap={optimality_gap(best_cost, bound):.2%}")
+    yield AnnealProgress(iteration, T, time.perf_counter() - start, current_cost, best_cost, boxset, best_order,
+                         best_layout, stop_reason, bound)
@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .bounds import INFEASIBLE
+from .box import Box
+from .cooling import SCHEDULES, geometric_steps
+from .cost_functions import PlacementEngine, advanced_cost_function, place_box
+from .manifest import boxset_from_columns, read_manifest
+from .sa_optimizer import simulated_annealing
+from .solution_io import SOLUTION_DTYPE, solution_to_array
+
+# 这个文件实现了常驻的本地装箱服务：asyncio HTTP 服务器（TCP 或 Unix socket）接收装箱请求，
+# 分发给预热好的进程池执行模拟退火，每个请求完成后立即返回，不再为每个请求启动一次解释器和导入 pandas。
+#
+# 接口（请求和响应都是 JSON）：
+#   GET  /health      -> {"status": "ok", "workers": n, "pending": k}
+#   POST /pack        -> 一个装箱请求，返回 {"cost", "elapsed", "feasible", "unplaced": [box_id, ...], "placements": [...]}
+#                        有箱子没有放下时 feasible 为 false，placements 只包含放下的箱子：
+#                        箱子放不进容器返回 422，期限内没有放完返回 504
+#   POST /pack/batch  -> {"requests": [...]}，按完成顺序逐行返回（NDJSON），每行带 "index"
+# 装箱请求：{"container": {"width", "height", "depth"},
+#            "boxes": [{"box_id", "width", "height", "depth", "is_fragile"}, ...] 或 "manifest_csv": "CSV 文本",
+#            "deadline": 秒（可选，从服务器收到请求开始计时）, "seed": 整数（可选）,
+#            "params": simulated_annealing 的其它参数（可选，如 max_iter、schedule、stagnation_window、gap_tolerance）}
+# 有 deadline 时换算成绝对的截止时刻（墙钟时间）交给子进程，子进程开始执行时把剩余时间作为 SA 的 time_budget 上限：
+# 没有指定 max_iter 时迭代次数与不设期限时相同（几何降温到 stop_T 的步数），小请求很快就返回，不会一直运行到期限；
+# 在队列中等待的时间也计入期限；开始执行时已经过期的请求直接返回 504，不再占用子进程。
+
+DEFAULT_CONTAINER = {'width': 18, 'height': 8, 'depth': 8}
+# SA 可以调整的参数及其取值检查；其余参数（如 checkpoint、workers）不通过服务暴露
+ALLOWED_PARAMS = {
+    'initial_temp': lambda v: _is_number(v) and v > 0,
+    'cooling_rate': lambda v: _is_number(v) and 0 < v < 1,
+    'stop_T': lambda v: _is_number(v) and v > 0,
+    'max_iter': lambda v: v is None or _is_int(v) and v >= 0,
+    'schedule': lambda v: v in SCHEDULES,
+    'stagnation_window': lambda v: v is None or _is_int(v) and v > 0,
+    'batch_size': lambda v: _is_int(v) and v > 0,
+    'gap_tolerance': lambda v: v is None or _is_number(v) and v >= 0,
+}
+# 留给结果序列化和返回的时间（秒）
+DEADLINE_MARGIN = 0.05
+
+class RequestError(ValueError):
+    pass
+
+class DeadlineExpired(Exception):
+    pass
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _is_number(value):
+    return (_is_int(value) or isinstance(value, float)) and math.isfinite(value)
+
+# 在提交给子进程之前检查容器、SA 参数和随机种子，不合法时抛出 RequestError（400）；箱子在子进程中解析时检查
+def _check_request(request):
+    container = request.get('container', DEFAULT_CONTAINER)
+    if not isinstance(container, dict):
+        raise RequestError("'container' must be an object with width, height and depth")
+    for name in ('width', 'height', 'depth'):
+        if not (_is_number(container.get(name)) and container[name] > 0):
+            raise RequestError(f"container {name} must be a positive number")
+    params = request.get('params', {})
+    if not isinstance(params, dict):
+        raise RequestError("'params' must be an object")
+    for name, value in params.items():
+        if name not in ALLOWED_PARAMS:
+            raise RequestError(f"unknown SA parameter {name!r}")
+        if not ALLOWED_PARAMS[name](value):
+            raise RequestError(f"invalid value for SA parameter {name!r}: {value!r}")
+    seed = request.get('seed')
+    if seed is not None and not _is_int(seed):
+        raise RequestError("'seed' must be an integer")
+
+def _warm_worker():
+    # 预先完成导入和一次小规模的成本计算，第一个真正的请求不再承担这部分开销
+    advanced_cost_function([Box(0, 1, 1, 1), Box(1, 1, 1, 1)], DEFAULT_CONTAINER)
+
+def _columns(request):
+    if 'manifest_csv' in request:
+        try:
+            return read_manifest(io.StringIO(request['manifest_csv']))
+        except (KeyError, TypeError, ValueError) as e:
+            raise RequestError(f"invalid manifest_csv: {e}")
+    boxes = request.get('boxes')
+    if not boxes:
+        raise RequestError("request needs 'boxes' or 'manifest_csv'")
+    try:
+        return {
+            'box_id': np.array([b['box_id'] for b in boxes], dtype=np.int64),
+            'width': np.array([b['width'] for b in boxes], dtype=np.float64),
+            'height': np.array([b['height'] for b in boxes], dtype=np.float64),
+            'depth': np.array([b['depth'] for b in boxes], dtype=np.float64),
+            'is_fragile': np.array([bool(int(b.get('is_fragile', 0))) for b in boxes]),
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise RequestError(f"invalid box: {e}")
+
+# 按解码器的规则（体积稳定降序，遇到第一个放不下的箱子就停止）重新放置，返回真正放下的箱子
+def _placed_boxes(boxes, container):
+    engine = PlacementEngine(container)
+    for box in sorted(boxes, key=lambda b: b.original_width * b.original_height * b.original_depth, reverse=True):
+        if not place_box(engine, box):
+            break
+    return engine.placed_boxes
+
+# 在子进程中执行一个装箱请求，返回 (HTTP 状态码, 响应字典)；expires 为截止时刻（time.time()），
+# 为 None 时按 params 中的迭代次数运行
+def _pack_job(request, expires):
+    start = time.perf_counter()
+    time_budget = None
+    if expires is not None:
+        time_budget = expires - time.time() - DEADLINE_MARGIN
+        if time_budget <= 0:
+            raise DeadlineExpired('deadline expired while the request was queued')
+    boxset = boxset_from_columns(_columns(request))
+    params = dict(request.get('params', {}))
+    if time_budget is not None and 'max_iter' not in params:
+        params['max_iter'] = geometric_steps(params.get('initial_temp', 1000), params.get('cooling_rate', 0.99),
+                                             params.get('stop_T', 1))
+    container = request.get('container', DEFAULT_CONTAINER)
+    solution, cost = simulated_annealing(boxset, container, rng=random.Random(request.get('seed')), verbose=False,
+                                         time_budget=time_budget, **params)
+    # 期限内没有放完时最优解只包含已经放下的箱子；放不进容器时解中没有放下的箱子位置无效，重新放置一遍找出放下的箱子
+    truncated = len(solution) < len(boxset)
+    if cost >= INFEASIBLE and not truncated:
+        solution = _placed_boxes(solution, container)
+    placed = {b.unique_id for b in solution}
+    unplaced = [box_id for box_id, uid in zip(boxset.box_ids.tolist(), boxset.unique_ids.tolist()) if uid not in placed]
+    records = solution_to_array(solution)
+    placements = [{name: record[name].item() for name in SOLUTION_DTYPE.names} for record in records]
+    result = {'cost': cost, 'elapsed': time.perf_counter() - start, 'feasible': not unplaced, 'unplaced': unplaced,
+              'placements': placements}
+    if not unplaced:
+        return 200, result
+    if truncated:
+        return 504, dict(result, error=f'deadline reached with {len(unplaced)} boxes not placed')
+    return 422, dict(result, error=f'{len(unplaced)} boxes do not fit in the container')
+
+class PackingService:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.pending = 0
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # 提前启动全部子进程（ProcessPoolExecutor 默认在提交任务时才按需启动）
+        for future in [self.executor.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    # 执行一个装箱请求，返回 (HTTP 状态码, 响应字典)
+    async def pack(self, request, received=None):
+        received = received if received is not None else time.perf_counter()
+        if not isinstance(request, dict):
+            return 400, {'error': 'request must be a JSON object'}
+        try:
+            _check_request(request)
+        except RequestError as e:
+            return 400, {'error': str(e)}
+        deadline = request.get('deadline')
+        expires = None
+        if deadline is not None:
+            try:
+                deadline = float(deadline)
+            except (TypeError, ValueError):
+                deadline = math.nan
+            if not math.isfinite(deadline):
+                return 400, {'error': "'deadline' must be a number of seconds"}
+            remaining = deadline - (time.perf_counter() - received)
+            if remaining - DEADLINE_MARGIN <= 0:
+                return 504, {'error': 'deadline expired before the request started'}
+            expires = time.time() + remaining
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            future = loop.run_in_executor(self.executor, _pack_job, request, expires)
+            if deadline is None:
+                result = await future
+            else:
+                # 子进程按截止时刻停止；这里再留一点余量等待结果返回
+                result = await asyncio.wait_for(future, max(expires - time.time(), 0) + DEADLINE_MARGIN)
+        except (asyncio.TimeoutError, DeadlineExpired):
+            return 504, {'error': 'deadline exceeded'}
+        except RequestError as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f'{type(e).__name__}: {e}'}
+        finally:
+            self.pending -= 1
+        return result
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                received = time.perf_counter()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                if method == 'GET' and path == '/health':
+                    await _respond(writer, 200, {'status': 'ok', 'workers': self.workers, 'pending': self.pending},
+                                   keep_alive)
+                elif method == 'POST' and path in ('/pack', '/pack/batch'):
+                    try:
+                        payload = json.loads(body or b'null')
+                    except ValueError:
+                        await _respond(writer, 400, {'error': 'invalid JSON'}, keep_alive)
+                    else:
+                        if path == '/pack':
+                            status, result = await self.pack(payload, received)
+                            await _respond(writer, status, result, keep_alive)
+                        else:
+                            await self._stream_batch(writer, payload, received)
+                            keep_alive = False
+                else:
+                    await _respond(writer, 404, {'error': f'no route for {method} {path}'}, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # 批量请求按完成顺序逐行写回（NDJSON），写完后关闭连接
+    async def _stream_batch(self, writer, payload, received):
+        requests = payload.get('requests') if isinstance(payload, dict) else None
+        if not isinstance(requests, list):
+            await _respond(writer, 400, {'error': "batch needs a 'requests' list"}, False)
+            return
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n')
+
+        async def run(index, request):
+            status, result = await self.pack(request, received)
+            return dict(result, index=index, status=status)
+
+        for finished in asyncio.as_completed([run(i, r) for i, r in enumerate(requests)]):
+            writer.write(json.dumps(await finished).encode() + b'\n')
+            await writer.drain()
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 422: 'Unprocessable Entity', 500: 'Internal Server Error', 504: 'Gateway Timeout'}
+
+async def _respond(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode() + body)
+    await writer.drain()
+
+# 启动服务，返回 asyncio Server；unix_path 不为 None 时监听 Unix socket，否则监听 host:port
+async def start_server(service, host='127.0.0.1', port=8765, unix_path=None):
+    if unix_path is not None:
+        return await asyncio.start_unix_server(service.handle, path=unix_path)
+    return await asyncio.start_server(service.handle, host, port)
+
+async def serve(host='127.0.0.1', port=8765, unix_path=None, workers=None):
+    service = PackingService(workers)
+    service.start()
+    server = await start_server(service, host, port, unix_path)
+    where = unix_path or f"http://{host}:{port}"
+    print(f"Packing service listening on {where} with {service.workers} worker(s)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the local packing service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, default=None, help='size of the worker process pool')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
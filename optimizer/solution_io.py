@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+# 这个文件定义了放置结果的二进制格式：一个定长记录的 NumPy 结构化数组，保存为 .npy 文件。
+# 读取时使用内存映射（memory map），评估和校验可以直接按列读取位置和尺寸，不需要解析文本。
+# CSV 导出作为可选步骤保留，列与原来的 CSV 输出一致。
+
+SOLUTION_DTYPE = np.dtype([
+    ('placement_order', np.int64),
+    ('box_id', np.int64),
+    ('x', np.float64),
+    ('y', np.float64),
+    ('z', np.float64),
+    ('width', np.float64),
+    ('height', np.float64),
+    ('depth', np.float64),
+    ('is_fragile', np.bool_),
+])
+
+def solution_to_array(solution):
+    records = np.zeros(len(solution), dtype=SOLUTION_DTYPE)
+    for idx, box in enumerate(solution):
+        records[idx] = (idx + 1, box.box_id, box.x, box.y, box.z,
+                        box.width, box.height, box.depth, box.is_fragile)
+    return records
+
+def save_solution_binary(solution, path):
+    np.save(path, solution_to_array(solution), allow_pickle=False)
+
+# 读取二进制结果；mmap=True 时返回只读的内存映射数组
+def load_solution(path, mmap=True):
+    records = np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+    if records.dtype != SOLUTION_DTYPE:
+        raise ValueError(f"{path} is not a solution file (dtype {records.dtype})")
+    return records
+
+# 返回列字典（每一列都是内存映射数组上的视图，不复制数据）
+def solution_columns(records):
+    return {name: records[name] for name in SOLUTION_DTYPE.names}
+
+def export_csv(records, csv_path):
+    if not isinstance(records, np.ndarray):
+        records = load_solution(records)
+    pd.DataFrame({name: records[name] for name in SOLUTION_DTYPE.names}).to_csv(csv_path, index=False)
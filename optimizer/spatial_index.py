@@ -0,0 +1,56 @@
+import math
+
+# 这个文件实现了一个均匀三维网格（uniform grid），作为已放置箱子的空间索引。
+# 每个箱子按其闭包围盒登记到覆盖的所有网格单元中，查询时只返回与查询区域相邻单元里的箱子，
+# 因此查询代价只与附近箱子的数量有关，而与容器中的箱子总数无关。支持增量插入。
+class UniformGrid:
+    def __init__(self, container, cell_size=None):
+        if cell_size is None:
+            cell_size = max(container['width'], container['height'], container['depth']) / 8
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        self.boxes = []
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def copy(self):
+        new = UniformGrid.__new__(UniformGrid)
+        new.cell_size = self.cell_size
+        new.cells = {key: list(slots) for key, slots in self.cells.items()}
+        new.boxes = list(self.boxes)
+        return new
+
+    def __iter__(self):
+        return iter(self.boxes)
+
+    def _cell_range(self, lo, hi):
+        c = self.cell_size
+        return range(math.floor(lo / c), math.floor(hi / c) + 1)
+
+    def insert(self, box):
+        slot = len(self.boxes)
+        self.boxes.append(box)
+        for i in self._cell_range(box.x, box.x + box.width):
+            for j in self._cell_range(box.y, box.y + box.height):
+                for k in self._cell_range(box.z, box.z + box.depth):
+                    self.cells.setdefault((i, j, k), []).append(slot)
+
+    # 返回闭区域 [x0, x1] × [y0, y1] × [z0, z1] 附近的箱子（可能包含少量不相交的箱子，按插入顺序）
+    def query(self, x0, y0, z0, x1, y1, z1):
+        slots = set()
+        cells = self.cells
+        for i in self._cell_range(x0, x1):
+            for j in self._cell_range(y0, y1):
+                for k in self._cell_range(z0, z1):
+                    cell = cells.get((i, j, k))
+                    if cell:
+                        slots.update(cell)
+        return [self.boxes[s] for s in sorted(slots)]
+
+    # 返回箱子向外扩展 margin 后区域内的箱子
+    def near(self, box, margin=0.0):
+        return self.query(box.x - margin, box.y - margin, box.z - margin,
+                          box.x + box.width + margin,
+                          box.y + box.height + margin,
+                          box.z + box.depth + margin)
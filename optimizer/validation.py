@@ -0,0 +1,135 @@
+import argparse
+import json
+import numpy as np
+from .evaluation import load_result
+
+# 这个文件实现了放置结果的校验：重叠的箱子对、超出容器边界的箱子和重复的 box_id。
+# 重叠检测使用沿 x 轴排序扫描（sort-and-sweep）加区间检查：先把箱子按 (y, z) 平面上的粗网格分桶，
+# 在每个桶内按 x 排序，只有同一个桶内 x 区间相交的箱子对才会继续检查 y、z 区间。
+# 分桶避免了紧密排列的方案中大量箱子 x 坐标相同导致的候选对爆炸，复杂度约为 O(n log n + k)。
+
+def _bucket_cells(lo, hi, cell):
+    first = np.floor(lo / cell).astype(np.int64)
+    last = np.maximum(first, np.ceil(hi / cell).astype(np.int64) - 1)
+    return first, last - first + 1
+
+# 返回所有重叠箱子对的行下标 (i, j)，i < j（按 i、j 排序）
+def find_overlaps(cols, block=2 ** 20):
+    n = len(cols['x'])
+    lo = np.column_stack([cols['x'], cols['y'], cols['z']]).astype(float).reshape(n, 3)
+    hi = lo + np.column_stack([cols['width'], cols['height'], cols['depth']]).reshape(n, 3)
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # 在 (y, z) 平面上分桶，网格大小取箱子尺寸的 90 分位数
+    cell = max(float(np.percentile(hi[:, 1:] - lo[:, 1:], 90)), 1e-9)
+    fy, ny = _bucket_cells(lo[:, 1], hi[:, 1], cell)
+    fz, nz = _bucket_cells(lo[:, 2], hi[:, 2], cell)
+    per_box = ny * nz
+    box = np.repeat(np.arange(n), per_box)
+    k = np.arange(per_box.sum()) - np.repeat(np.cumsum(per_box) - per_box, per_box)
+    cy = np.repeat(fy, per_box) + k // np.repeat(nz, per_box)
+    cz = np.repeat(fz, per_box) + k % np.repeat(nz, per_box)
+    _, bucket = np.unique(np.column_stack([cy, cz]), axis=0, return_inverse=True)
+    bucket = bucket.reshape(-1)
+
+    # x 坐标转成精确的整数秩，桶号和秩组合成一个整数键，排序后在每个桶内扫描
+    values, rank = np.unique(np.concatenate([lo[box, 0], hi[box, 0]]), return_inverse=True)
+    m = len(box)
+    key_lo = bucket * len(values) + rank[:m]
+    key_hi = bucket * len(values) + rank[m:]
+    order = np.argsort(key_lo, kind='stable')
+    # 排序后第 k 项只可能与 k+1 .. end[k]-1 在 x 方向上相交
+    end = np.searchsorted(key_lo[order], key_hi[order], side='left')
+    counts = np.maximum(end - np.arange(m) - 1, 0)
+
+    # 按块展开候选对（每块约 block 对），限制内存
+    cum = np.cumsum(counts)
+    starts = cum - counts
+    cuts = np.searchsorted(cum, np.arange(block, int(cum[-1]), block), side='left') + 1
+    pairs = []
+    for rows in np.split(np.arange(m), np.unique(cuts)):
+        if len(rows) == 0:
+            continue
+        c = counts[rows]
+        a = np.repeat(rows, c)
+        b = a + 1 + np.arange(c.sum()) - np.repeat(starts[rows] - starts[rows[0]], c)
+        i, j = box[order[a]], box[order[b]]
+        hit = i != j
+        for ax in range(3):
+            hit &= ~((hi[i, ax] <= lo[j, ax]) | (hi[j, ax] <= lo[i, ax]))
+        i, j = i[hit], j[hit]
+        pairs.append(np.minimum(i, j) * n + np.maximum(i, j))
+    found = np.unique(np.concatenate(pairs))
+    return np.column_stack([found // n, found % n])
+
+# 返回每个箱子在哪些轴上越界（负坐标或超出容器尺寸）
+def find_boundary_violations(cols, container):
+    axes = (('x', 'width', 'width'), ('y', 'height', 'height'), ('z', 'depth', 'depth'))
+    out = np.zeros((len(cols['x']), 3), dtype=bool)
+    for a, (pos, size, limit) in enumerate(axes):
+        out[:, a] = (cols[pos] < 0) | (cols[pos] + cols[size] > container[limit])
+    return out
+
+def find_duplicate_ids(cols):
+    ids, counts = np.unique(cols['box_id'], return_counts=True)
+    return ids[counts > 1]
+
+# 校验一个结果，返回结构化的报告；violations 中每条记录对应一个箱子的一个问题
+def validate(cols, container):
+    box_ids = cols['box_id']
+    duplicates = find_duplicate_ids(cols)
+    out = find_boundary_violations(cols, container)
+    overlaps = find_overlaps(cols)
+
+    violations = []
+    for box_id in duplicates:
+        violations.append({'box_id': int(box_id), 'type': 'duplicate_id'})
+    for row in np.nonzero(out.any(axis=1))[0]:
+        violations.append({'box_id': int(box_ids[row]), 'type': 'out_of_bounds',
+                           'axes': [axis for axis, bad in zip('xyz', out[row]) if bad]})
+    for i, j in overlaps:
+        violations.append({'box_id': int(box_ids[i]), 'type': 'overlap', 'other': int(box_ids[j])})
+        violations.append({'box_id': int(box_ids[j]), 'type': 'overlap', 'other': int(box_ids[i])})
+
+    return {
+        'valid': not violations,
+        'duplicate_ids': [int(v) for v in duplicates],
+        'boundary_violations': [int(box_ids[r]) for r in np.nonzero(out.any(axis=1))[0]],
+        'overlapping_pairs': [(int(box_ids[i]), int(box_ids[j])) for i, j in overlaps],
+        'violations': violations,
+    }
+
+def validate_file(path, container):
+    return validate(load_result(path), container)
+
+def print_summary(report):
+    if report['duplicate_ids']:
+        print(f"❌ Duplicate box_id found: {report['duplicate_ids']}")
+    else:
+        print("✅ No duplicate box_id")
+    if report['boundary_violations']:
+        print(f"❌ Boxes out of boundary: {report['boundary_violations']}")
+    else:
+        print("✅ No boundary violations")
+    if report['overlapping_pairs']:
+        print(f"❌ Overlapping box pairs: {report['overlapping_pairs']}")
+    else:
+        print("✅ No overlapping boxes")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate a box placement result')
+    parser.add_argument('path', help='placement result (.csv or binary .npy)')
+    parser.add_argument('--container', type=float, nargs=3, metavar=('WIDTH', 'HEIGHT', 'DEPTH'), required=True)
+    parser.add_argument('--json', action='store_true', help='print the structured report as JSON')
+    args = parser.parse_args(argv)
+    container = dict(zip(('width', 'height', 'depth'), args.container))
+    report = validate_file(args.path, container)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_summary(report)
+    return 0 if report['valid'] else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,9 +1,15 @@
 import pandas as pd
 import time
 from optimizer.sa_optimizer import simulated_annealing
-from optimizer.box import Box
+from optimizer.parallel import multi_start
+from optimizer.multi_container import pack_multi_container
+from optimizer.evaluation import save_split_containers
+from optimizer.result_cache import ResultCache, cached_optimize
+from optimizer import manifest
+from optimizer.solution_io import export_csv as export_solution_csv, save_solution_binary, solution_to_array
 import random
 import os
+import argparse
 
 # 规则：
 # 1. 箱子不能重叠
@@ -20,34 +26,34 @@ import os
 # 最后，它将优化后的箱子数据保存到另一个 CSV 文件中。该程序的设计允许用户轻松地调整容器的大小和模拟退火算法的参数，以获得最佳的箱子放置方案。
 
 def load_boxes(csv_path):
-    Box.counter = 1  # Reset static counter for consistent unique_id
-    df = pd.read_csv(csv_path)
-    df['is_fragile'] = df['is_fragile'].fillna(0).astype(int)
-    return [Box(
-        row['box_id'],
-        row['width'],
-        row['height'],
-        row['depth'],
-        row['is_fragile']
-    ) for _, row in df.iterrows()]
-
-def save_solution(solution, path, best_cost=None):
-    records = []
-    for idx, box in enumerate(solution):
-        records.append({
-            'placement_order': idx + 1,
-            'box_id': box.box_id,
-            'x': box.x,
-            'y': box.y,
-            'z': box.z,
-            'width': box.width,
-            'height': box.height,
-            'depth': box.depth,
-            'is_fragile': box.is_fragile
-        })
-    df = pd.DataFrame(records)
-    df.to_csv(path, index=False)
-    print(f"✅ Saved solution to {path}")
+    # 列式读取清单并批量创建箱子（unique_id 从 1 开始，保证结果一致）
+    return manifest.load_boxes(csv_path)
+
+# 路径以 .npy 结尾时保存为二进制格式（见 optimizer/solution_io.py），export_csv=True 时同时导出同名 CSV
+def save_solution(solution, path, best_cost=None, export_csv=False):
+    if path.endswith('.npy'):
+        save_solution_binary(solution, path)
+        print(f"✅ Saved solution to {path}")
+        if export_csv:
+            export_solution_csv(solution_to_array(solution), path[:-len('.npy')] + '.csv')
+            print(f"✅ Saved solution to {path[:-len('.npy')] + '.csv'}")
+    else:
+        records = []
+        for idx, box in enumerate(solution):
+            records.append({
+                'placement_order': idx + 1,
+                'box_id': box.box_id,
+                'x': box.x,
+                'y': box.y,
+                'z': box.z,
+                'width': box.width,
+                'height': box.height,
+                'depth': box.depth,
+                'is_fragile': box.is_fragile
+            })
+        df = pd.DataFrame(records)
+        df.to_csv(path, index=False)
+        print(f"✅ Saved solution to {path}")
     if best_cost is not None:
         print(f"   ↪ Cost: {best_cost:.2f}")
 
@@ -80,7 +86,41 @@ def random_permutation(boxes, container):
 def sort_by_position(boxes):
     return sorted(boxes, key=lambda b: (b.z, b.y, b.x))
 
-def run_experiments():
+# 解析 WxHxD 形式的容器尺寸（例如 18x8x8）
+def parse_container(text):
+    try:
+        width, height, depth = (float(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHTxDEPTH, got {text!r}")
+    if min(width, height, depth) <= 0:
+        raise argparse.ArgumentTypeError(f"container dimensions must be positive: {text!r}")
+    return {'width': width, 'height': height, 'depth': depth}
+
+# 删除 SA 结果文件：split=True 时删除按容器拆分的 sa_output_<k>.* 和 sa_output_containers.json，否则删除单容器的 sa_output.*
+def remove_sa_outputs(output_dir, split):
+    for name in os.listdir(output_dir):
+        stem, ext = os.path.splitext(name)
+        if split and name == 'sa_output_containers.json':
+            os.remove(os.path.join(output_dir, name))
+        if ext not in ('.npy', '.csv'):
+            continue
+        is_split = stem.startswith('sa_output_') and stem[len('sa_output_'):].isdigit()
+        if (split and is_split) or (not split and stem == 'sa_output'):
+            os.remove(os.path.join(output_dir, name))
+
+# workers > 1 时，多次 SA 重启在进程池中并行执行；seed 用于复现结果
+# 结果保存为二进制 .npy，export_csv=True 时同时导出 CSV
+# multi_container=True 时箱子放不下会自动打开新容器，每个容器的结果分别保存为 sa_output_<k>.npy；
+# container_types 为可选的容器类型列表（默认只有 18x8x8），新容器从中选择剩余箱子填得最满的类型，
+# 各容器的尺寸保存在 sa_output_containers.json 供评估脚本使用；greedy / random 基线照常生成。上一次另一种模式留下的 SA 结果会被删除，评估脚本不会读到过期的文件
+# time_budget（秒）为 SA 部分的总墙钟时间，平均分给各轮（并行执行的轮次共享同一段时间）
+# schedule / stagnation_window 传给 simulated_annealing（见 optimizer/cooling.py）
+# gap_tolerance 不为 None 时，最优成本与下界（见 optimizer/bounds.py）的相对间隙不超过它的那一轮提前结束
+# checkpoint_dir 不为 None 时每轮 SA 定期写检查点；被中断后用同样的参数重新运行即可从检查点继续
+# result_cache_dir 不为 None 时使用磁盘结果缓存（见 optimizer/result_cache.py）：相同的箱子组合、容器和参数直接返回保存的最优解
+def run_experiments(workers=1, seed=None, export_csv=True, multi_container=False, time_budget=None,
+                    schedule='geometric', stagnation_window=None, checkpoint_dir=None, result_cache_dir=None,
+                    gap_tolerance=None, container_types=None):
     input_path = 'data/box_sample.csv'
     container = {'width': 18, 'height': 8, 'depth': 8}
     total_runs = 5
@@ -88,31 +128,90 @@ def run_experiments():
     os.makedirs(output_dir, exist_ok=True)
 
     original_boxes = load_boxes(input_path)
+    sa_kwargs = {'schedule': schedule, 'stagnation_window': stagnation_window}
+    if gap_tolerance is not None:
+        sa_kwargs['gap_tolerance'] = gap_tolerance
+    if time_budget is not None:
+        rounds = -(-total_runs // max(workers, 1))
+        sa_kwargs.update(time_budget=time_budget / rounds, max_iter=None)
 
     # Simulated Annealing
-    best_sa_cost = float('inf')
-    best_sa_solution = None
-    for i in range(total_runs):
-        print(f"[SA Run {i+1}/{total_runs}]")
-        boxes = [b.copy() for b in original_boxes]
-        solution, cost = simulated_annealing(boxes, container)
-        if cost < best_sa_cost:
-            best_sa_cost = cost
-            best_sa_solution = solution
-    sorted_sa_solution = sort_by_position(best_sa_solution)
-    save_solution(sorted_sa_solution, os.path.join(output_dir, 'sa_output.csv'), best_sa_cost)
+    remove_sa_outputs(output_dir, split=not multi_container)
+    if multi_container:
+        packed = pack_multi_container(original_boxes, container_types or [container], workers=workers, seed=seed,
+                                      **sa_kwargs)
+        for k, result in enumerate(packed, 1):
+            save_solution(sort_by_position(result['boxes']), os.path.join(output_dir, f'sa_output_{k}.npy'),
+                          result['cost'], export_csv)
+        save_split_containers(os.path.join(output_dir, 'sa_output'), [result['container'] for result in packed])
+    else:
+        def optimize():
+            if workers > 1 or seed is not None:
+                return multi_start(original_boxes, container, runs=total_runs, workers=workers, seed=seed,
+                                   checkpoint_dir=checkpoint_dir, **sa_kwargs)
+            best_sa_cost = float('inf')
+            best_sa_solution = None
+            for i in range(total_runs):
+                print(f"[SA Run {i+1}/{total_runs}]")
+                boxes = [b.copy() for b in original_boxes]
+                run_kwargs = dict(sa_kwargs)
+                if checkpoint_dir is not None:
+                    os.makedirs(checkpoint_dir, exist_ok=True)
+                    run_kwargs['checkpoint'] = os.path.join(checkpoint_dir, f'run_{i + 1}.ckpt')
+                solution, cost = simulated_annealing(boxes, container, **run_kwargs)
+                if cost < best_sa_cost:
+                    best_sa_cost = cost
+                    best_sa_solution = solution
+            return best_sa_solution, best_sa_cost
+
+        if result_cache_dir is None:
+            best_sa_solution, best_sa_cost = optimize()
+        else:
+            cache = ResultCache(result_cache_dir)
+            params = dict(sa_kwargs, runs=total_runs, seed=seed)
+            best_sa_solution, best_sa_cost = cached_optimize(cache, original_boxes, container, params, optimize)
+            print(f"Result cache: {'hit' if cache.hits else 'miss'} ({result_cache_dir})")
+        sorted_sa_solution = sort_by_position(best_sa_solution)
+        save_solution(sorted_sa_solution, os.path.join(output_dir, 'sa_output.npy'), best_sa_cost, export_csv)
 
     # Greedy Heuristic
     print("[Greedy Heuristic]")
     greedy_result = greedy_heuristic([b.copy() for b in original_boxes], container)
     sorted_greedy = sort_by_position(greedy_result)
-    save_solution(sorted_greedy, os.path.join(output_dir, 'greedy_output.csv'))
+    save_solution(sorted_greedy, os.path.join(output_dir, 'greedy_output.npy'), export_csv=export_csv)
 
     # Random Permutation
     print("[Random Permutation]")
     random_result = random_permutation(original_boxes, container)
     sorted_random = sort_by_position(random_result)
-    save_solution(sorted_random, os.path.join(output_dir, 'random_output.csv'))
+    save_solution(sorted_random, os.path.join(output_dir, 'random_output.npy'), export_csv=export_csv)
 
 if __name__ == "__main__":
-    run_experiments()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1, help='number of processes for parallel SA restarts')
+    parser.add_argument('--seed', type=int, default=None, help='base seed for reproducible restarts')
+    parser.add_argument('--no-csv', action='store_true', help='only write binary .npy results')
+    parser.add_argument('--multi-container', action='store_true',
+                        help='open additional containers when the boxes do not fit in one')
+    parser.add_argument('--container-types', type=parse_container, nargs='+', default=None, metavar='WxHxD',
+                        help='container types to choose from in --multi-container mode (default 18x8x8)')
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help='wall-clock seconds for the SA phase; cooling adapts to the iterations achieved')
+    parser.add_argument('--schedule', choices=('geometric', 'acceptance', 'variance'), default='geometric',
+                        help='SA cooling schedule')
+    parser.add_argument('--stagnation-window', type=int, default=None,
+                        help='stop a SA run when the best cost has not improved for this many iterations')
+    parser.add_argument('--gap-tolerance', type=float, default=None,
+                        help='stop a SA run once its relative gap to the cost lower bound is this small')
+    parser.add_argument('--checkpoint-dir', default=None,
+                        help='write SA checkpoints here and resume from them when re-run')
+    parser.add_argument('--result-cache', default=None, metavar='DIR',
+                        help='reuse stored best solutions for repeated box mixes from this directory')
+    args = parser.parse_args()
+    if args.container_types and not args.multi_container:
+        parser.error('--container-types requires --multi-container')
+    run_experiments(workers=args.workers, seed=args.seed, export_csv=not args.no_csv,
+                    multi_container=args.multi_container, time_budget=args.time_budget,
+                    schedule=args.schedule, stagnation_window=args.stagnation_window,
+                    checkpoint_dir=args.checkpoint_dir, result_cache_dir=args.result_cache,
+                    gap_tolerance=args.gap_tolerance, container_types=args.container_types)
\ No newline at end of file
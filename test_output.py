@@ -1,13 +1,14 @@
 import pandas as pd
 import os
+from optimizer.evaluation import find_result, load_result
 
 # Container specification
 container = {'width': 18, 'height': 8, 'depth': 8}
 container_volume = container['width'] * container['height'] * container['depth']
 
-def load_boxes(csv_path):
-    df = pd.read_csv(csv_path)
-    return df.to_dict(orient='records')
+# 结果可以是 .npy 或 CSV（见 optimizer/evaluation.py 的 load_result）
+def load_boxes(path):
+    return pd.DataFrame(load_result(path)).to_dict(orient='records')
 
 def compute_volume_utilization(boxes):
     total_volume = sum(b['width'] * b['height'] * b['depth'] for b in boxes)
@@ -83,18 +84,19 @@ def evaluate_solution(path, strategy_name):
 def main():
     output_dir = 'data/results'
     strategies = {
-        'Simulated Annealing': os.path.join(output_dir, 'sa_output.csv'),
-        'Greedy Heuristic': os.path.join(output_dir, 'greedy_output.csv'),
-        'Random Permutation': os.path.join(output_dir, 'random_output.csv'),
-        'Baseline': os.path.join(output_dir, 'baseline_output.csv')
+        'Simulated Annealing': os.path.join(output_dir, 'sa_output'),
+        'Greedy Heuristic': os.path.join(output_dir, 'greedy_output'),
+        'Random Permutation': os.path.join(output_dir, 'random_output'),
+        'Baseline': os.path.join(output_dir, 'baseline_output')
     }
 
     results = []
-    for name, path in strategies.items():
-        if os.path.exists(path):
+    for name, stem in strategies.items():
+        path = find_result(stem)
+        if path is not None:
             results.append(evaluate_solution(path, name))
         else:
-            print(f"[Warning] File not found: {path}")
+            print(f"[Warning] File not found: {stem}.npy / {stem}.csv")
 
     # Save all evaluations to one file
     results_df = pd.DataFrame(results)
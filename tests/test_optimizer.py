@@ -1,12 +1,598 @@
-import pandas as pd
-import sys
+import asyncio
+import json
 import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from optimizer.sa_optimizer import simulated_annealing
+from benchmarks.generator import container_for, generate_manifest
+from benchmarks.runner import run_size
+from optimizer import parallel_tempering as pt
+from optimizer import profiling
+from optimizer.bounds import container_count_bound, cost_lower_bound, optimality_gap
+from optimizer.box import Box, distinct_orientations
+from optimizer.boxset import BoxSet
+from optimizer.cooling import AcceptanceRateCooling, GeometricCooling
+from optimizer.cost_cache import CostCache
+from optimizer.cost_functions import (PlacementEngine, advanced_cost_function, is_gap_too_large, is_touching,
+                                      overlap, pairwise_contact_scores, support_area_ratio,
+                                      try_place_with_contact_priority)
+from optimizer.evaluation import (evaluate_file, evaluate_files, find_result, find_split_results, load_split_containers,
+                                  save_split_containers)
+from optimizer.heightmap import HeightMap
+from optimizer.incremental import repack_incremental
+from optimizer.manifest import boxes_from_columns, iter_manifest, load_boxes, load_boxset
+from optimizer.multi_container import assign_containers, pack_multi_container
+from optimizer.parallel import multi_start
+from optimizer.parallel_tempering import parallel_tempering, temperature_ladder
+from optimizer.result_cache import ResultCache, cached_optimize, manifest_hash
+from optimizer.sa_optimizer import (apply_move, evaluate_batch, iter_annealing, perturb_state, propose_move,
+                                    simulated_annealing, undo_move)
+from optimizer.service import DeadlineExpired, PackingService, _pack_job, start_server
+from optimizer.solution_io import (export_csv, load_solution, save_solution_binary, solution_columns,
+                                   solution_to_array)
+from optimizer.spatial_index import UniformGrid
+from optimizer.validation import find_overlaps, validate
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CONTAINER = {'width': 18, 'height': 8, 'depth': 8}
+
+# 以下是多个测试共用的构造函数
+def sample_boxes(name='box_sample.csv'):
+    return load_boxes(os.path.join(DATA_DIR, name))
+
+# 三个不同尺寸的箱子，再加上 extra 中的 (width, height, depth[, is_fragile])，编号从 1 开始
+def mixed_boxes(*extra):
+    boxes = [Box(1, 5, 5, 5), Box(2, 2, 3, 4), Box(3, 4, 3, 2)]
+    return boxes + [Box(4 + i, *dims) for i, dims in enumerate(extra)]
+
+def cubes(n, size=2):
+    return [Box(i, size, size, size) for i in range(n)]
+
+def placed_box(box_id, x, y, z, width, height, depth):
+    box = Box(box_id, width, height, depth)
+    box.x, box.y, box.z = x, y, z
+    return box
+
+# 在箱子的副本上计算成本，不改动原来的箱子
+def fresh_cost(boxes, container=CONTAINER):
+    return advanced_cost_function([b.copy() for b in boxes], container)
+
+def is_valid(boxes, container):
+    return validate(solution_columns(solution_to_array(boxes)), container)['valid']
 
 def test_sa_runs():
-    df = pd.read_csv('data/box_placement_data.csv')
-    result = simulated_annealing(df)
+    boxes = sample_boxes('box_placement_data.csv')
+    result = simulated_annealing(boxes, CONTAINER, max_iter=50, rng=random.Random(0), verbose=False)
     assert isinstance(result, tuple)
-    assert len(result[0]) == len(df)
+    assert len(result[0]) == len(boxes)
+    assert result[1] < 1e12
+
+def test_extreme_point_placement_non_integer():
+    container = {'width': 5, 'height': 3, 'depth': 2.5}
+    engine = PlacementEngine(container)
+    boxes = [Box(i, 2.5, 1.5, 2.5) for i in range(4)]
+    for box in boxes:
+        assert engine.try_place(box)
+        engine.add(box)
+    for i, box in enumerate(boxes):
+        assert box.x + box.width <= container['width']
+        assert box.y + box.height <= container['height']
+        assert box.z + box.depth <= container['depth']
+        assert all(not overlap(box, other) for other in boxes[i + 1:])
+    assert not engine.try_place(Box(5, 1, 1, 1))
+
+def test_engine_drops_unusable_points_and_keeps_them_sorted():
+    rng = random.Random(2)
+    engine = PlacementEngine(CONTAINER)
+    engine.set_min_side(1)
+    for i in range(40):
+        box = Box(i, rng.choice([1, 1.5, 2, 3]), rng.choice([1, 2]), rng.choice([1, 2.5]))
+        if engine.try_place(box):
+            engine.add(box)
+    assert engine.sorted_points == sorted(engine.sorted_points)
+    assert {(x, y, z) for _, y, z, x in engine.sorted_points} == engine.extreme_points
+    # 剩下的每个点上都至少放得下一个 1×1×1 的箱子
+    for x, y, z in engine.extreme_points:
+        probe = placed_box(99, x, y, z, 1, 1, 1)
+        assert not any(overlap(probe, other) for other in engine.placed_boxes)
+        assert x + 1 <= CONTAINER['width'] and y + 1 <= CONTAINER['height'] and z + 1 <= CONTAINER['depth']
+
+def test_try_place_with_contact_priority_next_to_placed():
+    first = Box(1, 5, 5, 5)
+    assert try_place_with_contact_priority(first, [], CONTAINER)
+    second = Box(2, 5, 5, 5)
+    assert try_place_with_contact_priority(second, [first], CONTAINER)
+    assert (second.x, second.y, second.z) == (5, 0, 0)
+    # 传入引擎时复用它，不再按列表重建
+    engine = PlacementEngine(CONTAINER)
+    engine.add(first)
+    third = Box(3, 5, 5, 5)
+    assert try_place_with_contact_priority(third, engine, CONTAINER)
+    assert (third.x, third.y, third.z) == (5, 0, 0) and engine.placed_boxes == [first]
+
+def test_uniform_grid_queries_match_list():
+    boxes = [Box(1, 5, 5, 5), Box(2, 5, 4, 4), Box(3, 2, 2, 2), Box(4, 3, 3, 3)]
+    engine = PlacementEngine(CONTAINER, cell_size=2)
+    for box in boxes:
+        assert engine.try_place(box)
+        engine.add(box)
+    assert isinstance(engine.index, UniformGrid)
+    far = engine.index.query(17, 7, 7, 18, 8, 8)
+    assert boxes[0] not in far
+    for box in boxes:
+        assert support_area_ratio(box, engine.index) == support_area_ratio(box, boxes)
+        assert is_gap_too_large(box, engine.index) == is_gap_too_large(box, boxes)
+        assert is_touching(box, engine.index) == is_touching(box, boxes)
+
+def test_heightmap_support_matches_sampling():
+    bottom = Box(1, 4, 2, 4)
+    bridge = placed_box(2, 0, 5, 0, 6, 1, 2)
+    placed = [bottom, bridge]
+    heightmap = HeightMap(CONTAINER)
+    for box in placed:
+        heightmap.add(box)
+    # 悬空箱子下方、部分支撑、贴地和非对齐的情况都应与逐点采样一致
+    for x, y, z, w, d in [(0, 2, 0, 4, 4), (2, 2, 2, 4, 4), (0, 0, 5, 3, 3), (0.25, 2, 0, 3, 3), (1, 6, 0, 2, 2)]:
+        box = placed_box(9, x, y, z, w, 1, d)
+        assert support_area_ratio(box, placed, heightmap=heightmap) == support_area_ratio(box, placed)
+
+def test_cost_cache_hits_equivalent_states():
+    boxes = mixed_boxes((1, 2, 3, 1))
+    boxset = BoxSet.from_boxes(boxes)
+    cache = CostCache(maxsize=4)
+    order, orientation = boxset.initial_state()
+    cost, layout = boxset.evaluate(order, orientation, CONTAINER, cache)
+    assert cost == fresh_cost(boxes)
+    # 旋转箱子、移动不同体积的箱子都不改变规范状态
+    rotated = orientation.copy()
+    rotated[1] = 3
+    moved = np.array([3, 0, 1, 2])
+    assert boxset.evaluate(moved, rotated, CONTAINER, cache)[0] == cost
+    assert (cache.hits, cache.misses) == (1, 1)
+    hit_cost, hit_layout = boxset.cached(order, CONTAINER, cache)
+    assert hit_cost == cost and np.array_equal(hit_layout, layout)
+    assert boxset.cached(order, dict(CONTAINER, width=20), cache) is None
+    boxset.remember(order, dict(CONTAINER, width=20), cache, 1.0, layout)
+    assert boxset.cached(moved, dict(CONTAINER, width=20), cache)[0] == 1.0
+    # 字节数上限：箱子多时每个条目很大，按字节淘汰，条目数远小于 maxsize
+    big = BoxSet.from_boxes(cubes(200, size=0.5))
+    small_cache = CostCache(max_bytes=200 * 1024)
+    layout = np.zeros((200, 6))
+    for k in range(40):
+        big.remember(np.arange(200), dict(CONTAINER, width=20 + k), small_cache, float(k), layout)
+    assert small_cache.nbytes <= 200 * 1024 and 0 < len(small_cache) < 40
+    assert big.cached(np.arange(200), dict(CONTAINER, width=59), small_cache)[0] == 39.0
+
+def test_multi_start_reproducible_across_workers():
+    boxes = mixed_boxes((1, 2, 3, 1), (2, 2, 2))
+    serial = multi_start(boxes, CONTAINER, runs=2, workers=1, seed=3, max_iter=20)
+    pooled = multi_start(boxes, CONTAINER, runs=2, workers=2, seed=3, max_iter=20)
+    assert serial[1] == pooled[1]
+    assert [b.box_id for b in serial[0]] == [b.box_id for b in pooled[0]]
+
+def test_parallel_tempering_returns_best_solution():
+    boxes = mixed_boxes((2, 2, 2))
+    assert temperature_ladder(3, 1, 100) == [1, 10, 100]
+    solution, cost = parallel_tempering(boxes, CONTAINER, n_replicas=3, rounds=3, swap_interval=5,
+                                        workers=1, seed=2, verbose=False)
+    assert len(solution) == len(boxes)
+    assert cost <= fresh_cost(boxes)
+    # 所有段共用同一个工作进程缓存，后面的段能命中前面的段算过的状态；进程池运行结果相同
+    assert pt._worker_cache.hits > 0
+    pooled = parallel_tempering(boxes, CONTAINER, n_replicas=3, rounds=3, swap_interval=5,
+                                workers=2, seed=2, verbose=False)
+    assert pooled[1] == cost
+
+def test_batched_neighbourhood():
+    boxes = mixed_boxes((2, 2, 2))
+    boxset = BoxSet.from_boxes(boxes)
+    cache = CostCache()
+    rng = random.Random(0)
+    states = [perturb_state(*boxset.initial_state(), rng) for _ in range(4)]
+    results = evaluate_batch(boxset, states, CONTAINER, cache)
+    expected = [advanced_cost_function(boxset.to_boxes(order), CONTAINER) for order, _ in states]
+    assert [cost for cost, _ in results] == expected
+    assert cache.hits + cache.misses == 4
+    solution, cost = simulated_annealing(boxes, CONTAINER, max_iter=10, batch_size=3, rng=rng, verbose=False)
+    assert len(solution) == len(boxes)
+
+def test_boxset_round_trip():
+    boxes = [Box(1, 5, 4, 3), Box(2, 2, 3, 4, 1), Box(3, 1, 1, 2)]
+    boxes[1].rotate(4)
+    boxset = BoxSet.from_boxes(boxes)
+    assert boxset.orientation.tolist() == [0, 4, 0]
+    assert boxset.oriented_dims(boxset.orientation)[1].tolist() == [4, 2, 3]
+    order, orientation = boxset.initial_state()
+    cost, layout = boxset.evaluate(order, orientation, CONTAINER)
+    restored = boxset.to_boxes(order[::-1], layout)
+    assert [b.box_id for b in restored] == [3, 2, 1]
+    assert cost == advanced_cost_function(restored, CONTAINER)
+    assert [(b.x, b.y, b.z) for b in restored] == [tuple(layout[i, :3]) for i in order[::-1]]
+
+def test_move_apply_and_undo_in_place():
+    order = np.arange(6)
+    orientation = np.zeros(6, dtype=np.int8)
+    for seed in range(30):
+        expected = perturb_state(order, orientation, random.Random(seed))
+        move = propose_move(order, orientation, random.Random(seed))
+        apply_move(order, orientation, move)
+        assert order.tolist() == expected[0].tolist()
+        assert orientation.tolist() == expected[1].tolist()
+        undo_move(order, orientation, move)
+        assert order.tolist() == list(range(6))
+        assert not orientation.any()
+
+def test_pairwise_contact_scores_match_loops():
+    rng = random.Random(5)
+    engine = PlacementEngine(CONTAINER)
+    for i in range(25):
+        box = Box(i, rng.randint(1, 4), rng.randint(1, 3), rng.choice([1, 1.5, 2.5]))
+        if engine.try_place(box):
+            engine.add(box)
+    placed = engine.placed_boxes
+    touching, gap_too_large = pairwise_contact_scores(placed)
+    assert touching == sum(1 for a in placed for b in placed if a is not b and is_touching(a, [b]))
+    assert gap_too_large.tolist() == [is_gap_too_large(b, placed[:k + 1]) for k, b in enumerate(placed)]
+
+def test_evaluation_engine_metrics(tmp_path):
+    rows = pd.DataFrame([
+        {'box_id': 1, 'x': 0, 'y': 0, 'z': 0, 'width': 4, 'height': 2, 'depth': 4, 'is_fragile': True},
+        {'box_id': 2, 'x': 1, 'y': 2, 'z': 1, 'width': 2, 'height': 2, 'depth': 2, 'is_fragile': False},
+        {'box_id': 3, 'x': 6, 'y': 3, 'z': 2, 'width': 3, 'height': 3, 'depth': 3, 'is_fragile': False},
+    ])
+    path = tmp_path / 'plan.csv'
+    rows.to_csv(path, index=False)
+    # 一次调用评估多个策略，options 覆盖个别策略的参数
+    strict, lenient = evaluate_files({'strict': path, 'lenient': path}, CONTAINER, workers=1,
+                                     options={'strict': {'fragile_threshold': 8}}, fragile_threshold=10)
+    assert strict['Fragile Boxes Supported'] == 'No'
+    assert lenient['Fragile Boxes Supported'] == 'Yes'
+    assert strict['Total Box Volume'] == 32 + 8 + 27
+    assert strict['Proportion Supported (%)'] == round(2 / 3 * 100, 2)
+    assert strict['Boxes Against Walls'] == 1
+    assert strict['Maximum Stack Height'] == 6
+    # options 也可以为个别文件指定容器
+    small, large = evaluate_files({'small': path, 'large': path}, CONTAINER, workers=1,
+                                  options={'large': {'container': {'width': 36, 'height': 8, 'depth': 8}}})
+    assert large['Space Utilization (%)'] < small['Space Utilization (%)']
+
+def test_validator_matches_pairwise_check():
+    rng = np.random.default_rng(4)
+    n = 200
+    cols = {'box_id': np.arange(n), 'x': rng.integers(0, 20, n) * 0.5, 'y': rng.integers(0, 20, n) * 0.5,
+            'z': rng.integers(0, 20, n) * 0.5, 'width': rng.integers(1, 6, n) * 0.5,
+            'height': rng.integers(1, 6, n) * 0.5, 'depth': rng.integers(1, 6, n) * 0.5}
+    boxes = []
+    for i in range(n):
+        boxes.append(placed_box(i, *(cols[k][i] for k in ('x', 'y', 'z', 'width', 'height', 'depth'))))
+    expected = [(i, j) for i in range(n) for j in range(i + 1, n) if overlap(boxes[i], boxes[j])]
+    assert [tuple(p) for p in find_overlaps(cols, block=64).tolist()] == expected
+
+    cols['box_id'][1] = 0
+    report = validate(cols, {'width': 10, 'height': 10, 'depth': 10})
+    assert report['duplicate_ids'] == [0]
+    assert not report['valid']
+    assert len(report['overlapping_pairs']) == len(expected)
+
+def test_manifest_loader(tmp_path):
+    path = tmp_path / 'manifest.csv'
+    path.write_text("box_id,width,height,depth,is_fragile\n1,2,3,4,1\n2,1.5,1,1,\n3,1,1,1,0\n")
+    boxes = load_boxes(path)
+    assert [(b.box_id, b.width, b.is_fragile, b.unique_id) for b in boxes] == \
+        [(1, 2.0, True, 1), (2, 1.5, False, 2), (3, 1.0, False, 3)]
+    assert [len(c['box_id']) for c in iter_manifest(path, chunksize=2)] == [2, 1]
+    boxset = load_boxset(path, chunksize=2)
+    assert boxset.box_ids.tolist() == [1, 2, 3]
+    assert boxset.is_fragile.tolist() == [True, False, False]
+
+def test_binary_solution_round_trip(tmp_path):
+    boxes = [Box(7, 5, 5, 5, 1), Box(8, 2, 3, 4)]
+    boxes[1].rotate(2)
+    boxes[1].x = 5
+    path = str(tmp_path / 'plan.npy')
+    save_solution_binary(boxes, path)
+    records = load_solution(path)
+    assert isinstance(records, np.memmap)
+    assert records['box_id'].tolist() == [7, 8]
+    assert records[1]['width'] == 3 and records[1]['x'] == 5
+    assert records['is_fragile'].tolist() == [True, False]
+    export_csv(path, tmp_path / 'plan.csv')
+    binary = evaluate_file(path, CONTAINER, strategy='plan')
+    assert binary == evaluate_file(tmp_path / 'plan.csv', CONTAINER, strategy='plan')
+    # 评估脚本按前缀查找结果：优先 .npy，只有 CSV 时读取 CSV
+    assert find_result(str(tmp_path / 'plan')) == path
+    os.remove(path)
+    assert find_result(str(tmp_path / 'plan')) == str(tmp_path / 'plan.csv')
+    assert find_result(str(tmp_path / 'missing')) is None
+    for k in (1, 2):
+        save_solution_binary(boxes, str(tmp_path / f'plan_{k}.npy'))
+    assert find_split_results(str(tmp_path / 'plan')) == [str(tmp_path / 'plan_1.npy'), str(tmp_path / 'plan_2.npy')]
+    assert load_split_containers(str(tmp_path / 'plan')) is None
+    save_split_containers(str(tmp_path / 'plan'), [CONTAINER, {'width': 6, 'height': 4, 'depth': 4}])
+    assert load_split_containers(str(tmp_path / 'plan'))[1] == {'width': 6, 'height': 4, 'depth': 4}
+
+def test_multi_container_opens_extra_containers():
+    boxes = cubes(6, size=4)
+    container = {'width': 8, 'height': 4, 'depth': 4}
+    assignment = assign_containers(boxes, [container])
+    assert [len(group) for _, group in assignment] == [2, 2, 2]
+    packed = pack_multi_container(boxes, container, workers=1, seed=0, max_iter=5)
+    assert sorted(b.box_id for result in packed for b in result['boxes']) == list(range(6))
+    assert all(result['cost'] < 1e12 for result in packed)
+
+def test_multi_container_opens_least_waste_type():
+    boxes = cubes(8)
+    small = {'width': 4, 'height': 4, 'depth': 4}
+    assignment = assign_containers(boxes, [CONTAINER, small])
+    assert [(c, len(group)) for c, group in assignment] == [(small, 8)]
+
+def test_generator_is_seeded_and_benchmarks_run():
+    a = generate_manifest(50, seed=3, distribution='lognormal', fragile_ratio=0.3)
+    b = generate_manifest(50, seed=3, distribution='lognormal', fragile_ratio=0.3)
+    assert all(np.array_equal(a[k], b[k]) for k in a)
+    assert ((a['width'] * 2) % 1 == 0).all() and a['width'].min() >= 1 and a['width'].max() <= 5
+    container = container_for(a, fill=0.5)
+    assert container['width'] * container['height'] * container['depth'] >= 2 * (a['width'] * a['height'] * a['depth']).sum()
+    records = run_size(10, seed=1, repeat=1, sa_iterations=5)
+    assert {r['benchmark'] for r in records} == {'advanced_cost_function', 'placement_engine.try_place',
+                                                 'simulated_annealing', 'evaluate', 'validate'}
+    assert all(r['seconds'] > 0 for r in records)
+    assert all(r['feasible'] for r in records)
+    # 箱子总体积超过容器：记录为不可行，不计时评估器和校验
+    records = run_size(10, seed=1, fill=2.0, repeat=1, sa_iterations=5)
+    assert not any(r['feasible'] for r in records)
+    assert {r['benchmark'] for r in records}.isdisjoint({'evaluate', 'validate'})
+    # 指定容器和易碎比例
+    records = run_size(10, seed=1, repeat=1, sa_iterations=5, fragile_ratio=0.0,
+                       container={'width': 20, 'height': 10, 'depth': 10})
+    assert all(r['container'] == '20x10x10' and r['fragile_ratio'] == 0.0 for r in records)
+
+def test_profiling_is_opt_in_and_records_phases():
+    boxes = [Box(i, 2, 2, 2, is_fragile=i % 2) for i in range(8)]
+    assert profiling.active is None
+    cost = fresh_cost(boxes)
+    prof = profiling.Profiler()
+    solution, best = simulated_annealing(boxes, CONTAINER, max_iter=5, rng=random.Random(0), verbose=False,
+                                         profile=prof)
+    assert profiling.active is None
+    stats = prof.snapshot()
+    assert {'candidates', 'overlap', 'support', 'extreme_points', 'gap_and_touching'} <= set(stats['phases'])
+    assert stats['counters']['placements'] >= len(boxes)
+    assert stats['counters']['overlap_tests'] > 0
+    with profiling.profile() as p:
+        assert fresh_cost(boxes) == cost
+    assert p.counters['cost_evaluations'] == 1
+
+def test_time_budget_and_anytime_progress():
+    boxes = sample_boxes()
+    seen = []
+    start = time.perf_counter()
+    solution, cost = simulated_annealing(boxes, CONTAINER, max_iter=None, time_budget=0.3, rng=random.Random(0),
+                                         verbose=False, callback=lambda p: seen.append(p.best_cost))
+    assert time.perf_counter() - start < 1.5
+    assert seen == sorted(seen, reverse=True) and seen[-1] == cost
+    assert len(solution) == len(boxes)
+    # 迭代器接口：拿到第一个快照后就可以停止，快照中的解始终可用
+    first = next(iter_annealing(boxes, CONTAINER, rng=random.Random(0), verbose=False))
+    assert first.iteration == 0 and len(first.solution()) == len(boxes)
+
+def test_time_budget_holds_on_large_instances():
+    # 500 个箱子的一次完整评估需要好几秒：初始解也要在期限内停下，返回已经放下的箱子
+    cols = generate_manifest(500, seed=0)
+    container = container_for(cols)
+    boxes = boxes_from_columns(cols)
+    start = time.perf_counter()
+    final = list(iter_annealing(boxes, container, max_iter=None, time_budget=0.5, rng=random.Random(0),
+                                verbose=False))[-1]
+    assert time.perf_counter() - start <= 0.5 + 0.2
+    assert final.stop_reason == 'time_budget'
+    partial = final.solution()
+    assert 0 < len(partial) < len(boxes) and final.best_cost == 1e12
+    assert is_valid(partial, container)
+
+def test_adaptive_cooling_and_stagnation_stop():
+    assert GeometricCooling(0.9).update(100, True, True, 0) == 90
+    hot, cold = AcceptanceRateCooling(0.9, target=0.3), AcceptanceRateCooling(0.9, target=0.3)
+    for _ in range(10):
+        T_hot = hot.update(100, True, True, 0)
+        T_cold = cold.update(100, False, True, 0)
+    assert T_hot < 90 < T_cold < 100
+    boxes = sample_boxes()
+    for schedule in ('geometric', 'acceptance', 'variance'):
+        *_, last = iter_annealing(boxes, CONTAINER, rng=random.Random(0), verbose=False, schedule=schedule,
+                                  stagnation_window=30)
+        assert last.stop_reason in ('stagnation', 'temperature')
+        assert last.iteration < 688 and last.best_cost < 1e12
+
+def test_checkpoint_resume_matches_uninterrupted_run(tmp_path):
+    boxes = sample_boxes()
+    *_, reference = iter_annealing(boxes, CONTAINER, max_iter=120, rng=random.Random(4), verbose=False,
+                                   schedule='acceptance')
+    path = str(tmp_path / 'run.ckpt')
+    # 模拟中途被终止：第 60 步后的第一个快照处丢弃生成器，之后的调用从最后一个检查点继续
+    for progress in iter_annealing(boxes, CONTAINER, max_iter=120, rng=random.Random(4), verbose=False,
+                                   schedule='acceptance', checkpoint=path, checkpoint_every=25):
+        if progress.iteration >= 60:
+            break
+    else:
+        raise AssertionError('run finished before the simulated interruption')
+    *_, resumed = iter_annealing(boxes, CONTAINER, max_iter=120, rng=random.Random(0), verbose=False,
+                                 schedule='acceptance', checkpoint=path, checkpoint_every=25)
+    assert (resumed.iteration, resumed.best_cost) == (reference.iteration, reference.best_cost)
+    assert [(b.box_id, b.x, b.y, b.z) for b in resumed.solution()] == \
+        [(b.box_id, b.x, b.y, b.z) for b in reference.solution()]
+    # 运行结束后的检查点带有停止原因，再次运行直接返回结果；参数或容器不同则拒绝继续
+    finished = list(iter_annealing(boxes, CONTAINER, max_iter=120, rng=random.Random(0), verbose=False,
+                                   schedule='acceptance', checkpoint=path))
+    assert len(finished) == 1 and finished[0].stop_reason == 'max_iter'
+    assert finished[0].best_cost == reference.best_cost
+    with pytest.raises(ValueError, match='max_iter'):
+        list(iter_annealing(boxes, CONTAINER, max_iter=200, verbose=False, schedule='acceptance', checkpoint=path))
+    with pytest.raises(ValueError, match='container'):
+        list(iter_annealing(boxes, {'width': 20, 'height': 8, 'depth': 8}, max_iter=120, verbose=False,
+                            schedule='acceptance', checkpoint=path))
+
+def test_packing_service_round_trip():
+    async def call(port, method, path, payload=None):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                     + body)
+        head, _, data = (await reader.read()).partition(b'\r\n\r\n')
+        writer.close()
+        return int(head.split()[1]), [json.loads(line) for line in data.splitlines()]
+
+    async def scenario():
+        service = PackingService(workers=1)
+        service.start()
+        server = await start_server(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            boxes = [{'box_id': i, 'width': 2, 'height': 2, 'depth': 2, 'is_fragile': i % 2} for i in range(6)]
+            status, [result] = await call(port, 'POST', '/pack', {'boxes': boxes, 'container': CONTAINER,
+                                                                  'seed': 0, 'params': {'max_iter': 5}})
+            assert status == 200 and result['cost'] < 1e12
+            assert result['feasible'] and result['unplaced'] == []
+            assert sorted(p['box_id'] for p in result['placements']) == list(range(6))
+            # 放不下的箱子：422，只返回真正放下的箱子，并列出没有放下的箱子编号
+            status, [result] = await call(port, 'POST', '/pack', {'boxes': boxes, 'params': {'max_iter': 5},
+                                                                  'container': {'width': 4, 'height': 2, 'depth': 2}})
+            assert status == 422 and not result['feasible'] and len(result['unplaced']) == 4
+            assert set(p['box_id'] for p in result['placements']).isdisjoint(result['unplaced'])
+            assert sorted((p['x'], p['y'], p['z']) for p in result['placements']) == [(0, 0, 0), (2, 0, 0)]
+            status, lines = await call(port, 'POST', '/pack/batch', {'requests': [
+                {'boxes': boxes, 'deadline': 5, 'params': {'max_iter': 5}}, {'boxes': boxes, 'deadline': 0}, {},
+                {'boxes': boxes, 'deadline': 'abc'}, {'manifest_csv': 'not,a\nmanifest'}]})
+            assert sorted((line['index'], line['status']) for line in lines) == \
+                [(0, 200), (1, 504), (2, 400), (3, 400), (4, 400)]
+            # 不合法的容器、参数和种子在提交给子进程之前就返回 400
+            bad = [{'container': {'width': 'a'}}, {'container': [18, 8, 8]}, {'container': dict(CONTAINER, depth=0)},
+                   {'params': 'x'}, {'params': {'max_iter': 'abc'}}, {'params': {'schedule': 'nope'}},
+                   {'params': {'cooling_rate': 1.5}}, {'params': {'checkpoint': 'x'}}, {'seed': [1]}, {'seed': True}]
+            status, lines = await call(port, 'POST', '/pack/batch', {'requests': [dict(r, boxes=boxes) for r in bad]})
+            assert all(line['status'] == 400 for line in lines) and len(lines) == len(bad)
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+    asyncio.run(scenario())
+    # 截止时刻在排队期间已经过去：子进程不再运行 SA
+    with pytest.raises(DeadlineExpired):
+        _pack_job({'boxes': [{'box_id': 0, 'width': 1, 'height': 1, 'depth': 1}]}, time.time() - 1)
+    # 期限内放不完所有箱子：504，返回已经放下的箱子和没有放下的箱子编号
+    cols = generate_manifest(500, seed=0)
+    request = {'boxes': [{'box_id': i, 'width': w, 'height': h, 'depth': d} for i, w, h, d in
+                         zip(cols['box_id'].tolist(), cols['width'].tolist(), cols['height'].tolist(),
+                             cols['depth'].tolist())],
+               'container': container_for(cols)}
+    status, result = _pack_job(request, time.time() + 0.5)
+    assert status == 504 and not result['feasible'] and result['unplaced']
+    assert len(result['placements']) + len(result['unplaced']) == 500
+    # 期限只是上限：小请求按正常的迭代次数运行，不会一直运行到期限
+    start = time.perf_counter()
+    _pack_job({'boxes': [{'box_id': i, 'width': 2, 'height': 2, 'depth': 2} for i in range(3)]}, time.time() + 5)
+    assert time.perf_counter() - start < 1
+
+def test_incremental_repack_keeps_unaffected_boxes_fixed():
+    boxes = cubes(12)
+    advanced_cost_function(boxes, CONTAINER)
+    before = {b.box_id: (b.x, b.y, b.z) for b in boxes}
+    top = max(boxes, key=lambda b: (b.y, b.z, b.x)).box_id
+    result = repack_incremental(boxes, CONTAINER, added=[Box(50, 2, 2, 2), Box(51, 1, 2, 2)], removed=[top],
+                                refine_iter=20, rng=random.Random(0))
+    assert result['mode'] == 'incremental' and result['replaced'] == 2
+    placed = {b.box_id: (b.x, b.y, b.z) for b in result['boxes']}
+    assert set(placed) == set(before) - {top} | {50, 51}
+    assert all(placed[i] == before[i] for i in before if i != top)
+    assert is_valid(result['boxes'], CONTAINER)
+    # 新增箱子的 id 与保留的箱子重复
+    with pytest.raises(ValueError):
+        repack_incremental(boxes, CONTAINER, added=[Box(0, 1, 1, 1)])
+    # 放不下时退回完整退火，剩余的时间预算同样限制完整退火
+    start = time.perf_counter()
+    result = repack_incremental(boxes, CONTAINER, added=[Box(100 + i, 4, 4, 4) for i in range(40)],
+                                time_budget=0.3, rng=random.Random(0), stop_T=0, max_iter=10 ** 6)
+    assert result['mode'] == 'full' and time.perf_counter() - start < 2
+
+def test_result_cache_remaps_ids_and_bounds_size(tmp_path):
+    boxes = [Box(i, 1 + i % 3, 2, 3, is_fragile=i % 2) for i in range(10)]
+    cache = ResultCache(str(tmp_path / 'cache'))
+    solution, cost = cached_optimize(cache, boxes, CONTAINER, {'max_iter': 10},
+                                     lambda: simulated_annealing(boxes, CONTAINER, max_iter=10, verbose=False,
+                                                                 rng=random.Random(0)))
+    # 同一组箱子：新的 id、不同的顺序、不同的原始尺寸顺序
+    renamed = [Box(100 + i, 3, 2, 1 + b.box_id % 3, is_fragile=b.is_fragile) for i, b in enumerate(reversed(boxes))]
+    hit, hit_cost = cached_optimize(cache, renamed, CONTAINER, {'max_iter': 10}, lambda: 1 / 0)
+    assert hit_cost == cost and cache.hits == 1
+    assert sorted(b.box_id for b in hit) == list(range(100, 110))
+    assert [(b.x, b.y, b.z, b.width, b.height, b.depth) for b in hit] == \
+        [(b.x, b.y, b.z, b.width, b.height, b.depth) for b in solution]
+    assert cached_optimize(cache, renamed, CONTAINER, {'max_iter': 11}, lambda: (hit, 1.0))[1] == 1.0
+
+    # 多个写入者同时写入，目录大小保持在上限附近，剩下的条目都可以读取
+    small = ResultCache(str(tmp_path / 'small'), max_bytes=4000)
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda k: small.put(boxes, CONTAINER, {'k': k}, solution, cost), range(40)))
+    files = [f for f in os.listdir(small.directory) if f.endswith('.npz')]
+    assert 0 < len(files) < 40 and not [f for f in os.listdir(small.directory) if f.endswith('.tmp')]
+    kept = [k for k in range(40) if f"{manifest_hash(boxes, CONTAINER, {'k': k})}.npz" in files]
+    assert all(small.get(boxes, CONTAINER, {'k': k}) is not None for k in kept)
+
+def test_orientation_pruning_dedups_and_drops_oversized():
+    assert distinct_orientations((2.0, 2.0, 2.0)) == (0,)
+    assert len(distinct_orientations((1.0, 2.0, 2.0))) == 3
+    assert len(distinct_orientations((1.0, 2.0, 3.0))) == 6
+    # 10 只能沿 width 方向（18）放下
+    tall = Box(0, 2, 10, 3)
+    feasible = tall.feasible_orientations(CONTAINER)
+    assert feasible == (2, 3)
+    for idx in feasible:
+        tall.rotate(idx)
+        assert tall.width == 10
+    assert Box(1, 9, 19, 9).feasible_orientations(CONTAINER) == ()
+    boxes = [tall, Box(2, 3, 3, 3)]
+    assert advanced_cost_function(boxes, CONTAINER) < 1e12 and tall.width == 10
+
+def test_orientation_pruning_counts_skipped_searches():
+    boxes = cubes(5)
+    with profiling.profile() as prof:
+        advanced_cost_function(boxes, CONTAINER)
+    assert prof.snapshot()['counters']['orientations_pruned'] == 25
+
+def test_lower_bounds_hold_and_count_containers():
+    rng = random.Random(3)
+    for _ in range(30):
+        boxes = [Box(i, rng.randint(1, 5), rng.randint(1, 5), rng.randint(1, 5), rng.random() < 0.3)
+                 for i in range(rng.randint(1, 30))]
+        bound = cost_lower_bound(boxes, CONTAINER, search_nodes=200)
+        for _ in range(3):
+            rng.shuffle(boxes)
+            assert fresh_cost(boxes) >= bound
+    # 三边都超过容器一半的箱子只能各占一个容器，体积下界只有 2
+    big = [Box(i, 10, 5, 5) for i in range(3)]
+    assert container_count_bound(big, CONTAINER) == 3
+    assert len(assign_containers(big, CONTAINER)) == 3
+    assert container_count_bound([Box(0, 18, 8, 8), Box(1, 1, 1, 1)], CONTAINER) == 2
+    assert abs(optimality_gap(110.0, 100.0) - 10 / 110) < 1e-12
+
+def test_sa_stops_at_gap_tolerance():
+    # 放不下的清单：下界就是 1e12 惩罚，不做任何迭代
+    progress = list(iter_annealing([Box(i, 9, 8, 8) for i in range(3)], CONTAINER, verbose=False, gap_tolerance=0.0))
+    assert progress[-1].stop_reason == 'gap' and progress[-1].iteration == 0 and progress[-1].gap == 0.0
+    # 小容器中的细长小箱子必然贴边：1e6 的边缘惩罚在下界中是确定的，第一个解的间隙就很小
+    small = {'width': 4, 'height': 4, 'depth': 4}
+    boxes = [Box(i, 1, 1, 3) for i in range(6)]
+    final = list(iter_annealing(boxes, small, verbose=False, rng=random.Random(0), gap_tolerance=1e-3))[-1]
+    assert final.stop_reason == 'gap' and final.gap <= 1e-3 and final.best_cost >= final.lower_bound
+    assert list(iter_annealing(boxes, small, verbose=False, rng=random.Random(0)))[-1].stop_reason == 'temperature'
+    # 真实清单：分支搜索证明至少有 5 个小箱子贴边，退火达到这个数之后立即停止
+    boxes = sample_boxes()
+    final = list(iter_annealing(boxes, CONTAINER, verbose=False, rng=random.Random(0), gap_tolerance=1e-3))[-1]
+    assert final.stop_reason == 'gap' and final.lower_bound > 5e6 - 1e3 and final.iteration < 100